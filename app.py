@@ -6,6 +6,7 @@ import traceback
 
 from learning import air_qlearn
 from simulation import air_simul
+from sweep import sweep_worker
 
 
 def qlearn_worker(workdir):
@@ -24,7 +25,7 @@ class MainApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Laboratorium 3 - Q-learning")
-        self.geometry("500x300")
+        self.geometry("500x350")
         self.resizable(False, False)
 
         # Katalog roboczy
@@ -43,6 +44,11 @@ class MainApp(tk.Tk):
                   command=self.run_qlearn,
                   bg="#d0ffd0").pack(fill="x", padx=10, pady=(15, 5))
 
+        # Przycisk uruchamiający przegląd hiperparametrów
+        tk.Button(self, text="Przegląd parametrów (plik JSON)...",
+                  command=self.run_sweep,
+                  bg="#e0ffe0").pack(fill="x", padx=10, pady=(0, 5))
+
         # Wybór pliku do symulacji
         self.sim_file = tk.StringVar()
         tk.Label(self, text="Plik do symulacji:").pack(
@@ -72,7 +78,8 @@ class MainApp(tk.Tk):
     def choose_file(self):
         filename = filedialog.askopenfilename(
             initialdir=self.workdir.get(), filetypes=[
-                ("Pliki pickle", "*.pkl"), ("Wszystkie pliki", "*.*")])
+                ("Punkty kontrolne", "*.npz"), ("Pliki pickle", "*.pkl"),
+                ("Wszystkie pliki", "*.*")])
         if filename:
             self.sim_file.set(filename)
 
@@ -84,6 +91,21 @@ class MainApp(tk.Tk):
         messagebox.showinfo(
             "Info", "Uwaga! Możesz uruchomić kolejne przypadki równolegle.")
 
+    def run_sweep(self):
+        filename = filedialog.askopenfilename(
+            initialdir=self.workdir.get(), filetypes=[
+                ("Pliki JSON", "*.json"), ("Wszystkie pliki", "*.*")])
+        if not filename:
+            return
+        os.chdir(self.workdir.get())
+        p = multiprocessing.Process(
+            target=sweep_worker, args=(filename, self.workdir.get()))
+        p.start()
+        messagebox.showinfo(
+            "Info", "Przegląd uruchomiony w tle. Wyniki w katalogu "
+            f"{os.path.splitext(os.path.basename(filename))[0]}"
+            "/summary.csv.")
+
     def run_simul(self):
         os.chdir(self.workdir.get())
         if self.sim_file.get():
@@ -0,0 +1,408 @@
+"""
+Pomiary wydajności obliczeń (bez interfejsu graficznego).
+
+Zestaw obejmuje:
+    - mikropomiary jąder obliczeniowych (rk_4, indeksowanie stanu,
+      normalize_fi, aw_matrices_AB) w wersjach skalarnych i wsadowych,
+    - porównanie rk_4 dla każdego modelu: wersja wyjściowa (zamrożona
+      kopia sprzed optymalizacji), ścieżka tablicowa i ścieżka skalarna,
+    - krótkie przebiegi uczenia dla każdego modelu z `tasks` i każdego
+      typu sterowania z `controls` (kroki/s, aktualizacje Q/s, czas
+      epizodu).
+
+Wyniki można zapisać do pliku JSON i porównać z wcześniejszym pomiarem.
+
+Uruchomienie:
+    python benchmark.py [--json wynik.json] [--compare poprzedni.json]
+                        [--episodes N] [--maxit N] [--n-envs N] [--quick]
+                        [--integrator NAZWA] [--substeps N]
+"""
+import argparse
+import functools
+import json
+import platform
+import subprocess
+import time
+import timeit
+
+import numpy as np
+
+from trainer import tasks, controls, make_trainer
+from toolbox import (
+    StateGrid,
+    aw_matrices_AB,
+    normalize_fi,
+    normalize_fi_batch,
+    rk_4,
+    rk_4_batch,
+    state_global_index,
+)
+
+
+def time_per_call(func, number, repeat=5):
+    """Najlepszy z `repeat` pomiarów czasu jednego wywołania [s]."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def default_grid():
+    dx1 = 0.025
+    dx2 = 0.05
+    x1 = np.arange(-np.pi, np.pi + dx1, dx1)
+    x2 = np.arange(-np.pi, np.pi + dx2, dx2)
+    return x1, x2
+
+
+# Wyjściowe (sprzed optymalizacji) wersje rk_4 i modeli dynamiki, zamrożone
+# jako punkt odniesienia dla bench_rk4. Nie należy ich zmieniać razem z
+# toolbox.rk_4 ani dynamics.py.
+
+def _baseline_rk_4(rhs, dt, x, u):
+    x = np.asarray(x)
+    k1 = rhs(x, u)
+    k2 = rhs(x + dt/2 * k1, u)
+    k3 = rhs(x + dt/2 * k2, u)
+    k4 = rhs(x + dt * k3, u)
+    return x + dt/6 * (k1 + 2*k2 + 2*k3 + k4)
+
+
+def _baseline_dynamics0(x, u):
+    x = np.asarray(x)
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    theta_ddot = (g / L) * np.sin(x[0]) + u / (m * L**2)
+    return np.array([x[1], theta_ddot])
+
+
+def _baseline_dynamics1(x, u):
+    x = np.asarray(x)
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    xdot2 = g / L * np.sin(x[0]) - 0.05 * np.sign(x[1])
+    return np.array([x[1], xdot2 + u / (m * L**2)])
+
+
+def _baseline_dynamics2(x, u):
+    x = np.asarray(x)
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    return np.array([
+        x[1],
+        g / L * np.sin(x[0]) + (-0.1 * x[0]**3) + u / (m * L**2)
+    ])
+
+
+def _baseline_dynamics3(x, u):
+    x = np.asarray(x)
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    if abs(x[0]) < 0.7:
+        g = 0.0
+    return np.array([x[1], g / L * np.sin(x[0]) + u / (m * L**2)])
+
+
+def _baseline_dynamics4(x, u):
+    x = np.asarray(x)
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    xdot2 = 0.0
+    if x[0] < 0.7 and x[0] > 0.0:
+        xdot2 = 1.0 * (0.7 - x[0])
+    if x[0] > -0.7 and x[0] < 0.0:
+        xdot2 = 1.0 * (-0.7 - x[0])
+    return np.array([
+        x[1],
+        g / L * np.sin(x[0]) + xdot2 + u / (m * L**2)
+    ])
+
+
+def _baseline_dynamics5(x, u):
+    x = np.asarray(x)
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    if abs(x[0]) < 0.7:
+        m = 10.0
+    return np.array([x[1], g / L * np.sin(x[0]) + u / (m * L**2)])
+
+
+def _baseline_dynamics6(x, u):
+    x = np.asarray(x)
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    noise = 1.0 * np.random.randn()
+    return np.array([
+        x[1],
+        g / L * np.sin(x[0]) + u / (m * L**2) + noise
+    ])
+
+
+def _baseline_dynamics7(x, u):
+    x = np.asarray(x)
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    if x[0] > 0.7:
+        L = 0.5
+    elif x[0] < -0.7:
+        L = 0.5
+    return np.array([x[1], g / L * np.sin(x[0]) + u / (m * L**2)])
+
+
+def _baseline_dynamicsS(x, u):
+    x = np.asarray(x)
+    g = 1.0
+    L = 1.0 + 0.5 * u
+    return np.array([x[1], g / L * np.sin(x[0]) - 0.005 * x[1]])
+
+
+_BASELINE_MODELS = dict(zip(tasks, (
+    _baseline_dynamics0, _baseline_dynamics1, _baseline_dynamics2,
+    _baseline_dynamics3, _baseline_dynamics4, _baseline_dynamics5,
+    _baseline_dynamics6, _baseline_dynamics7, _baseline_dynamicsS,
+)))
+
+
+def bench_rk4(number=20000):
+    """
+    Porównanie kroku rk_4 dla każdego modelu z `tasks`: wersja wyjściowa
+    (zamrożone rk_4 i model sprzed optymalizacji), bieżąca ścieżka
+    tablicowa i ścieżka skalarna na liczbach float. Przyspieszenie
+    liczone jest względem wersji wyjściowej.
+
+    Zwraca:
+        list: słowniki z czasami kroku [us] i przyspieszeniem
+    """
+    x = np.array([2.5, -0.3])
+    u = 0.5
+    dt = 0.1
+    rows = []
+    for name, dynamics in tasks.items():
+        baseline = _BASELINE_MODELS[name]
+        # functools.partial ukrywa atrybut `scalar` -> ścieżka tablicowa
+        generic = functools.partial(dynamics)
+
+        np.random.seed(0)
+        x_baseline = _baseline_rk_4(baseline, dt, x, u)
+        np.random.seed(0)
+        x_fast = rk_4(dynamics, dt, x, u)
+
+        t_baseline = time_per_call(
+            lambda: _baseline_rk_4(baseline, dt, x, u), number)
+        t_generic = time_per_call(lambda: rk_4(generic, dt, x, u), number)
+        t_fast = time_per_call(lambda: rk_4(dynamics, dt, x, u), number)
+        rows.append({
+            'model': name,
+            'baseline_us': t_baseline * 1e6,
+            'array_us': t_generic * 1e6,
+            'scalar_us': t_fast * 1e6,
+            'speedup': t_baseline / t_fast,
+            'identical': bool(np.array_equal(x_baseline, x_fast)),
+        })
+    return rows
+
+
+def bench_kernels(number=20000, batch=1024):
+    """
+    Mikropomiary jąder obliczeniowych.
+
+    Zwraca:
+        list: słowniki {'kernel', 'us_per_call', 'ns_per_item'}
+    """
+    rng = np.random.default_rng(0)
+    x1, x2 = default_grid()
+    n_x2 = len(x2)
+    grid = StateGrid(x1, x2)
+    dynamics = tasks['Wahadło proste']
+    x = np.array([2.5, -0.3])
+    X = np.column_stack([rng.uniform(-np.pi, np.pi, batch),
+                         rng.uniform(-np.pi, np.pi, batch)])
+    U = rng.uniform(-1, 1, batch)
+    fi = 3.3
+    FI = rng.uniform(-2 * np.pi, 2 * np.pi, batch)
+    n_batch = max(1, number // 100)
+
+    cases = [
+        ('rk_4', 1, number,
+         lambda: rk_4(dynamics, 0.1, x, 0.5)),
+        ('rk_4_batch', batch, n_batch,
+         lambda: rk_4_batch(dynamics, 0.1, X, U)),
+        ('state_global_index', 1, number,
+         lambda: state_global_index(x, x1, x2, n_x2)),
+        ('StateGrid.index', 1, number,
+         lambda: grid.index(x)),
+        ('StateGrid.index_batch', batch, n_batch,
+         lambda: grid.index_batch(X)),
+        ('normalize_fi', 1, number,
+         lambda: normalize_fi(fi)),
+        ('normalize_fi_batch', batch, n_batch,
+         lambda: normalize_fi_batch(FI)),
+        ('aw_matrices_AB', 1, max(1, number // 10),
+         lambda: aw_matrices_AB(dynamics, x, 0.0, np.array([0.5]), 2, 1)),
+    ]
+    rows = []
+    for name, items, n, func in cases:
+        t = time_per_call(func, n)
+        rows.append({
+            'kernel': name,
+            'items': items,
+            'us_per_call': t * 1e6,
+            'ns_per_item': t * 1e9 / items,
+        })
+    return rows
+
+
+def bench_training(episodes=20, maxit=200, n_envs=1, models=None,
+                   control_names=None, integrator='rk4', substeps=1):
+    """
+    Krótkie przebiegi uczenia dla par (model, sterowanie).
+
+    Zwraca:
+        list: słowniki z przepustowością uczenia
+    """
+    models = list(tasks) if models is None else models
+    control_names = list(controls) if control_names is None \
+        else control_names
+    rows = []
+    for model in models:
+        for control in control_names:
+            np.random.seed(0)
+            trainer = make_trainer({
+                'dynamics': model,
+                'control': control,
+                'maxEpisodes': episodes,
+                'maxit': maxit,
+                'n_envs': n_envs,
+                'integrator': integrator,
+                'substeps': substeps,
+            })
+            start_time = time.perf_counter()
+            results = trainer.run()
+            elapsed = time.perf_counter() - start_time
+            rows.append({
+                'model': model,
+                'control': control,
+                'n_envs': n_envs,
+                'integrator': integrator,
+                'substeps': substeps,
+                'episodes': results['episodes'],
+                'steps': results['steps'],
+                'updates': results['updates'],
+                'elapsed_s': elapsed,
+                'steps_per_s': results['steps'] / elapsed,
+                'updates_per_s': results['updates'] / elapsed,
+                'ms_per_episode': 1e3 * elapsed / results['episodes'],
+            })
+    return rows
+
+
+def environment():
+    """Opis środowiska pomiaru."""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = ''
+    return {
+        'revision': revision,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+    }
+
+
+def run_suite(episodes=20, maxit=200, n_envs=1, quick=False,
+              integrator='rk4', substeps=1):
+    """Pełny zestaw pomiarów jako słownik gotowy do zapisu w JSON."""
+    number = 2000 if quick else 20000
+    training = bench_training(episodes, maxit, integrator=integrator,
+                              substeps=substeps)
+    if n_envs > 1:
+        training += bench_training(episodes, maxit, n_envs=n_envs,
+                                   integrator=integrator, substeps=substeps)
+    return {
+        'environment': environment(),
+        'kernels': bench_kernels(number),
+        'rk4': bench_rk4(number),
+        'training': training,
+    }
+
+
+def compare(current, baseline):
+    """Wypisuje stosunek wyników bieżących do wyników bazowych."""
+    def index(rows, *keys):
+        return {tuple(row[k] for k in keys): row for row in rows}
+
+    print("\nPorównanie z pomiarem bazowym "
+          f"({baseline['environment'].get('revision', '?')}):")
+    old = index(baseline.get('kernels', []), 'kernel')
+    for key, row in index(current['kernels'], 'kernel').items():
+        if key in old:
+            ratio = old[key]['us_per_call'] / row['us_per_call']
+            print(f"  {key[0]:32s} x{ratio:7.2f}")
+    old = index(baseline.get('training', []), 'model', 'control', 'n_envs')
+    for key, row in index(current['training'], 'model', 'control',
+                          'n_envs').items():
+        if key in old:
+            ratio = row['steps_per_s'] / old[key]['steps_per_s']
+            print(f"  {key[0]:38s} {key[1]:14s} n={key[2]:<5d} "
+                  f"x{ratio:7.2f}")
+
+
+def print_suite(results):
+    print(f"{'Jądro':32s} {'us/wywołanie':>13s} {'ns/element':>11s}")
+    for row in results['kernels']:
+        print(f"{row['kernel']:32s} {row['us_per_call']:13.3f} "
+              f"{row['ns_per_item']:11.1f}")
+
+    print(f"\n{'Model':40s} {'wyjściowy [us]':>14s} {'tablice [us]':>12s} "
+          f"{'float [us]':>12s} {'przysp.':>8s} {'zgodne':>7s}")
+    for row in results['rk4']:
+        print(f"{row['model']:40s} {row['baseline_us']:14.2f} "
+              f"{row['array_us']:12.2f} {row['scalar_us']:12.2f} "
+              f"{row['speedup']:8.1f} {str(row['identical']):>7s}")
+
+    print(f"\n{'Model':38s} {'Sterowanie':14s} {'n_envs':>6s} "
+          f"{'kroki/s':>10s} {'akt. Q/s':>10s} {'ms/epizod':>10s}")
+    for row in results['training']:
+        print(f"{row['model']:38s} {row['control']:14s} "
+              f"{row['n_envs']:6d} {row['steps_per_s']:10.0f} "
+              f"{row['updates_per_s']:10.0f} {row['ms_per_episode']:10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pomiary wydajności uczenia Q")
+    parser.add_argument('--json', help="zapis wyników do pliku JSON")
+    parser.add_argument('--compare', help="plik JSON z pomiarem bazowym")
+    parser.add_argument('--episodes', type=int, default=20,
+                        help="liczba epizodów na przebieg")
+    parser.add_argument('--maxit', type=int, default=200,
+                        help="maksymalna liczba kroków w epizodzie")
+    parser.add_argument('--n-envs', type=int, default=1,
+                        help="dodatkowy pomiar trybu wsadowego")
+    parser.add_argument('--quick', action='store_true',
+                        help="krótsze mikropomiary")
+    parser.add_argument('--integrator', default='rk4',
+                        help="integrator przebiegów uczenia")
+    parser.add_argument('--substeps', type=int, default=1,
+                        help="liczba podkroków integratora")
+    args = parser.parse_args()
+
+    results = run_suite(args.episodes, args.maxit, args.n_envs, args.quick,
+                        args.integrator, args.substeps)
+    print_suite(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
@@ -0,0 +1,348 @@
+"""
+Punkty kontrolne uczenia w formacie .npz.
+
+Plik zawiera tablice (Q, U, siatka, sterowanie, historia metryk) oraz
+nagłówek JSON z parametrami uczenia (klucz 'meta'). Zapis odbywa się do
+pliku tymczasowego i kończy atomową zamianą nazwy, więc czytelnik nigdy nie
+zobaczy częściowo zapisanego pliku. CheckpointWriter wykonuje zapis w
+wątku w tle, dzięki czemu uczenie nie czeka na dysk.
+"""
+import json
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+from trainer import tasks
+
+FORMAT_VERSION = 1
+
+
+def dynamics_name(dynamics):
+    """Nazwa zadania z `tasks` dla funkcji dynamiki (lub jej __name__)."""
+    for name, func in tasks.items():
+        if func is dynamics:
+            return name
+    return dynamics.__name__
+
+
+def snapshot(trainer, q_dtype=None):
+    """
+    Kopia stanu trenera do zapisu: (tablice, nagłówek).
+
+    Parametry:
+        trainer : QLearnTrainer
+        q_dtype : dtype lub None
+            Typ zapisu Q (np. np.float32); None - bez konwersji
+    """
+    Q = trainer.Q
+    Q = Q.astype(q_dtype) if q_dtype is not None else Q.copy()
+    arrays = {
+        'Q': Q,
+        'U': trainer.U.copy(),
+        'x1': trainer.x1,
+        'x2': trainer.x2,
+        'control': trainer.control,
+        'Vmean': np.array(trainer.Vmean),
+        'dVmean': np.array(trainer.dVmean),
+        'Qmean': np.array(trainer.Qmean),
+        'dQmean': np.array(trainer.dQmean),
+    }
+    memory = getattr(trainer, 'memory', None)
+    memory_pos = 0
+    if memory is not None:
+        # pamięć przejść Dyna-Q
+        memory_arrays, memory_pos = memory.state()
+        arrays.update(memory_arrays)
+    # stan generatora losowego - wznowienie przebiegu krok w krok
+    _, rng_keys, rng_pos, has_gauss, cached_gaussian = np.random.get_state()
+    arrays['rng_keys'] = rng_keys
+
+    config = getattr(trainer, 'config', {})
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'label': config.get('label', ''),
+        'dynamics': dynamics_name(trainer.dynamics),
+        'control_name': config.get('control', ''),
+        'u_max': float(config.get('u_max', np.max(np.abs(trainer.control)))),
+        'dt': trainer.dt,
+        'integrator': trainer.integrator,
+        'substeps': trainer.substeps,
+        'method': trainer.method,
+        'lam': trainer.lam,
+        'maxit': trainer.maxit,
+        'maxEpisodes': trainer.maxEpisodes,
+        'alpha': trainer.alpha,
+        'gamma': trainer.gamma,
+        'epsil': trainer.epsil,
+        'epsilDecay': trainer.epsilDecay,
+        'Qx1': trainer.Qx1,
+        'Qx2': trainer.Qx2,
+        'Ru1': trainer.Ru1,
+        'x_InitCond': trainer.x_InitCond.tolist(),
+        'episodes_done': trainer.episodes_done,
+        'steps': trainer.steps,
+        'updates': trainer.updates,
+        'elapsed': trainer.elapsed,
+        'stop_reason': trainer.stop_reason,
+        'policy_changes': int(trainer.policy_changes),
+        'stable_episodes': trainer.stable_episodes,
+        'memory_pos': memory_pos,
+        'q_dtype': str(Q.dtype),
+        'rng': {
+            'pos': int(rng_pos),
+            'has_gauss': int(has_gauss),
+            'cached_gaussian': float(cached_gaussian),
+        },
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'config': config,
+    }
+    return arrays, meta
+
+
+def write_checkpoint(path, arrays, meta):
+    """Atomowy zapis tablic i nagłówka do pliku .npz."""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = os.path.join(directory,
+                       f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        np.savez(f, meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                 **arrays)
+    os.replace(tmp, path)
+
+
+def save_checkpoint(trainer, path, q_dtype=None):
+    """Synchroniczny zapis punktu kontrolnego trenera."""
+    write_checkpoint(path, *snapshot(trainer, q_dtype))
+
+
+def load_checkpoint(path):
+    """
+    Wczytanie punktu kontrolnego.
+
+    Zwraca:
+        arrays : dict
+            Tablice zapisane w pliku
+        meta : dict
+            Nagłówek JSON
+    """
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files if key != 'meta'}
+        meta = json.loads(str(data['meta']))
+    return arrays, meta
+
+
+def load_policy(path):
+    """
+    Wczytanie strategii do symulacji z pliku .npz (punkt kontrolny) lub
+    .pkl (dawny format). Zwraca słownik w układzie dawnego pliku pickle.
+    """
+    if not path.endswith('.npz'):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    arrays, meta = load_checkpoint(path)
+    return {
+        'StudInd': meta['label'],
+        'DynName': meta['dynamics'],
+        'DynamicsAct': tasks[meta['dynamics']],
+        'U': arrays['U'],
+        'Q': arrays['Q'],
+        'dt': meta['dt'],
+        'integrator': meta.get('integrator', 'rk4'),
+        'substeps': meta.get('substeps', 1),
+        'maxit': meta['maxit'],
+        'u_max': meta['u_max'],
+        'x1': arrays['x1'],
+        'x2': arrays['x2'],
+        'control': arrays['control'],
+    }
+
+
+def resume_training(trainer, path, warm_start=False):
+    """
+    Wznowienie uczenia z punktu kontrolnego.
+
+    Sprawdzana jest zgodność modelu dynamiki, siatki i sterowania (przy
+    pełnym wznowieniu także dt i integratora). Przy pełnym wznowieniu
+    odtwarzane są Q, licznik epizodów i kroków, epsilon, historia metryk,
+    licznik epizodów bez zmiany strategii (policy_patience), pamięć przejść
+    Dyna-Q oraz stan generatora losowego, więc uczenie jest
+    kontynuowane dokładnie od miejsca zapisu.
+    Przy warm_start=True przejmowana jest tylko Q-funkcja (start nowego
+    przebiegu z Q innego, pokrewnego przebiegu).
+
+    Parametry:
+        trainer : QLearnTrainer
+            Trener o tej samej konfiguracji zadania
+        path : str
+            Ścieżka pliku .npz
+        warm_start : bool
+            Tylko Q-funkcja zamiast pełnego stanu
+
+    Zwraca:
+        dict: nagłówek punktu kontrolnego
+    """
+    arrays, meta = load_checkpoint(path)
+
+    if meta['dynamics'] != dynamics_name(trainer.dynamics):
+        raise ValueError(
+            f"Checkpoint dynamics '{meta['dynamics']}' does not match "
+            f"'{dynamics_name(trainer.dynamics)}'.")
+    if not (np.array_equal(arrays['x1'], trainer.x1)
+            and np.array_equal(arrays['x2'], trainer.x2)):
+        raise ValueError("Checkpoint state grid does not match.")
+    if not np.array_equal(arrays['control'], trainer.control):
+        raise ValueError("Checkpoint control set does not match.")
+    if not warm_start and meta['dt'] != trainer.dt:
+        raise ValueError(
+            f"Checkpoint dt={meta['dt']} does not match dt={trainer.dt}.")
+    integrator = (meta.get('integrator', 'rk4'), meta.get('substeps', 1))
+    if not warm_start and integrator != (trainer.integrator,
+                                         trainer.substeps):
+        raise ValueError(
+            f"Checkpoint integrator {integrator} does not match "
+            f"{(trainer.integrator, trainer.substeps)}.")
+
+    trainer.Q[...] = arrays['Q']
+    if not warm_start:
+        trainer.episode = meta['episodes_done']
+        trainer.episodes_done = meta['episodes_done']
+        trainer.steps = meta['steps']
+        trainer.updates = meta.get('updates', meta['steps'])
+        trainer.elapsed = meta['elapsed']
+        trainer.epsil = meta['epsil']
+        trainer.Vmean = arrays['Vmean'].tolist()
+        trainer.dVmean = arrays['dVmean'].tolist()
+        trainer.Qmean = arrays['Qmean'].tolist()
+        trainer.dQmean = arrays['dQmean'].tolist()
+        if trainer.memory is not None and 'memory_k_x' in arrays:
+            trainer.memory.restore(arrays, meta.get('memory_pos', 0))
+        if 'rng_keys' in arrays:
+            rng = meta['rng']
+            np.random.set_state((
+                'MT19937', arrays['rng_keys'], rng['pos'],
+                rng['has_gauss'], rng['cached_gaussian']))
+    trainer.refresh_statistics()
+    if not warm_start:
+        # po refresh_statistics, który liczy zmiany U od zera
+        trainer.policy_changes = meta.get('policy_changes', 0)
+        trainer.stable_episodes = meta.get('stable_episodes', 0)
+    return meta
+
+
+class CheckpointWriter:
+    """
+    Obserwator trenera zapisujący punkty kontrolne w wątku w tle.
+
+    Na wątku uczenia wykonywana jest tylko kopia tablic; zapis na dysk
+    odbywa się w osobnym wątku. Jeżeli poprzedni zapis jeszcze trwa,
+    oczekujący (starszy) stan jest zastępowany nowszym, więc uczenie nigdy
+    nie czeka na dysk.
+
+    Parametry:
+        path : str
+            Ścieżka pliku .npz
+        every_episodes : int lub None
+            Zapis co tyle epizodów
+        every_seconds : float lub None
+            Zapis, jeżeli od poprzedniego minęło co najmniej tyle sekund
+        q_dtype : dtype lub None
+            Typ zapisu Q (np. np.float32)
+    """
+
+    profile_phase = 'checkpoint'
+
+    def __init__(self, path, every_episodes=10, every_seconds=None,
+                 q_dtype=None):
+        if every_episodes is None and every_seconds is None:
+            raise ValueError(
+                "Either every_episodes or every_seconds must be set.")
+        self.path = path
+        self.every_episodes = every_episodes
+        self.every_seconds = every_seconds
+        self.q_dtype = q_dtype
+        self.error = None
+        self.written = 0  # liczba zapisanych punktów kontrolnych
+
+        self._last_time = time.time()
+        self._last_episode = None
+        self._pending = None
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def due(self, trainer):
+        """
+        Czy po bieżącym epizodzie należy zapisać punkt kontrolny. Licznik
+        epizodów może rosnąć skokami (uczenie równoległe, parallel.py) -
+        wtedy zapis następuje po przekroczeniu kolejnej wielokrotności
+        every_episodes.
+        """
+        episode, last = trainer.episode, self._last_episode
+        self._last_episode = episode
+        every = self.every_episodes
+        if every is not None and (
+                episode % every == 0
+                or (last is not None and episode // every > last // every)):
+            return True
+        return (self.every_seconds is not None
+                and time.time() - self._last_time >= self.every_seconds)
+
+    def __call__(self, trainer):
+        if self.due(trainer):
+            self.submit(trainer)
+
+    def submit(self, trainer):
+        """Przekazuje kopię stanu trenera do zapisu w tle."""
+        if self.error is not None:
+            raise self.error
+        data = snapshot(trainer, self.q_dtype)
+        self._last_time = time.time()
+        with self._cond:
+            self._pending = data
+            self._cond.notify()
+
+    def flush(self):
+        """Czeka na zapis oczekującego punktu kontrolnego."""
+        with self._cond:
+            while self._pending is not None or self._busy:
+                self._cond.wait()
+        if self.error is not None:
+            raise self.error
+
+    def close(self, trainer=None):
+        """
+        Kończy pracę wątku; jeżeli podano trenera, zapisuje jego stan
+        końcowy.
+        """
+        if trainer is not None:
+            self.submit(trainer)
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                data, self._pending = self._pending, None
+                self._busy = True
+            try:
+                write_checkpoint(self.path, *data)
+                self.written += 1
+            except Exception as e:
+                self.error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
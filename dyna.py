@@ -0,0 +1,94 @@
+"""
+Pamięć przejść dla planowania Dyna-Q.
+
+Każdy rzeczywisty krok uczenia zapisuje przejście (k_x, k_u, k1_x, r) w
+buforze cyklicznym o stałym rozmiarze (tablice numpy, bez obiektów
+Pythona). Trener (QLearnTrainer(..., planning_steps=K)) po każdym kroku
+lub epizodzie wykonuje K aktualizacji Q na przejściach wylosowanych z
+pamięci, wielokrotnie wykorzystując kosztowne całkowanie równań ruchu.
+"""
+import numpy as np
+
+
+class TransitionMemory:
+    """
+    Bufor cykliczny przejść (k_x, k_u, k1_x, r).
+
+    Po zapełnieniu najstarsze przejścia są nadpisywane.
+
+    Parametry:
+        capacity : int
+            Maksymalna liczba przechowywanych przejść
+    """
+
+    def __init__(self, capacity=100000):
+        if not (capacity >= 1):
+            raise ValueError("Memory capacity must be a positive integer.")
+        self.capacity = int(capacity)
+        self.k_x = np.zeros(self.capacity, dtype=np.intp)
+        self.k_u = np.zeros(self.capacity, dtype=np.intp)
+        self.k1_x = np.zeros(self.capacity, dtype=np.intp)
+        self.r = np.zeros(self.capacity)
+        self.pos = 0  # miejsce zapisu kolejnego przejścia
+        self.size = 0  # liczba zapisanych przejść
+
+    def __len__(self):
+        return self.size
+
+    def add(self, k_x, k_u, k1_x, r):
+        """Zapis jednego przejścia."""
+        pos = self.pos
+        self.k_x[pos] = k_x
+        self.k_u[pos] = k_u
+        self.k1_x[pos] = k1_x
+        self.r[pos] = r
+        self.pos = (pos + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def add_batch(self, k_x, k_u, k1_x, r):
+        """Zapis wielu przejść naraz (tablice o jednakowej długości)."""
+        n = len(k_x)
+        if n > self.capacity:
+            # zostają tylko najnowsze przejścia
+            k_x, k_u, k1_x, r = (a[-self.capacity:]
+                                 for a in (k_x, k_u, k1_x, r))
+            n = self.capacity
+        idx = (self.pos + np.arange(n)) % self.capacity
+        self.k_x[idx] = k_x
+        self.k_u[idx] = k_u
+        self.k1_x[idx] = k1_x
+        self.r[idx] = r
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, n):
+        """
+        Losowanie n przejść (ze zwracaniem).
+
+        Zwraca:
+            tuple: tablice (k_x, k_u, k1_x, r)
+        """
+        idx = np.random.randint(self.size, size=n)
+        return self.k_x[idx], self.k_u[idx], self.k1_x[idx], self.r[idx]
+
+    def state(self):
+        """Tablice i pozycja zapisu (do punktu kontrolnego)."""
+        n = self.size
+        arrays = {
+            'memory_k_x': self.k_x[:n].copy(),
+            'memory_k_u': self.k_u[:n].copy(),
+            'memory_k1_x': self.k1_x[:n].copy(),
+            'memory_r': self.r[:n].copy(),
+        }
+        return arrays, self.pos
+
+    def restore(self, arrays, pos):
+        """Odtworzenie zawartości zapisanej przez state()."""
+        n = min(len(arrays['memory_k_x']), self.capacity)
+        self.k_x[:n] = arrays['memory_k_x'][:n]
+        self.k_u[:n] = arrays['memory_k_u'][:n]
+        self.k1_x[:n] = arrays['memory_k1_x'][:n]
+        self.r[:n] = arrays['memory_r'][:n]
+        self.size = n
+        self.pos = pos % self.capacity if n == self.capacity else n
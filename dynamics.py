@@ -1,3 +1,5 @@
+import math
+
 import numpy as np
 
 
@@ -7,13 +9,13 @@ def dynamics0(x, u):
     Funkcja oblicza pochodną stanu dla prostego wahadła z momentem u.
 
     Parametry:
-        x : iterable (theta, theta_dot)
+        x : iterable (theta, theta_dot) lub ndarray (N, 2)
             Aktualny stan (kąt i prędkość kątowa)
-        u : float
+        u : float lub ndarray (N,)
             Moment siły (sterowanie)
 
     Zwraca:
-        xdot : ndarray
+        xdot : ndarray (2,) lub (N, 2)
             Pochodna stanu [theta_dot, theta_ddot]
     """
     x = np.asarray(x)
@@ -22,12 +24,18 @@ def dynamics0(x, u):
     g = 1.0
     L = 1.0
 
-    theta = x[0]
-    theta_dot = x[1]
+    if x.ndim == 1:
+        theta = x[0]
+        theta_dot = x[1]
+        theta_ddot = (g / L) * np.sin(theta) + u / (m * L**2)
+        return np.array([theta_dot, theta_ddot])
+
+    theta = x[:, 0]
+    theta_dot = x[:, 1]
 
     theta_ddot = (g / L) * np.sin(theta) + u / (m * L**2)
 
-    return np.array([theta_dot, theta_ddot])
+    return np.array([theta_dot, theta_ddot]).T
 
 
 def dynamics1(x, u):
@@ -38,21 +46,26 @@ def dynamics1(x, u):
     z dodatkowym oporem.
 
     Parametry:
-        x : iterable (theta, theta_dot)
+        x : iterable (theta, theta_dot) lub ndarray (N, 2)
             Aktualny stan (kąt i prędkość kątowa)
-        u : float
+        u : float lub ndarray (N,)
             Moment siły (sterowanie)
 
     Zwraca:
-        xdot : ndarray
+        xdot : ndarray (2,) lub (N, 2)
             Pochodna stanu [theta_dot, theta_ddot]
     """
     x = np.asarray(x)
     m = 1.0
     g = 1.0
     L = 1.0
-    xdot2 = g / L * np.sin(x[0]) - 0.05 * np.sign(x[1])
-    xdot = np.array([x[1], xdot2 + u / (m * L**2)])
+    if x.ndim == 1:
+        xdot2 = g / L * np.sin(x[0]) - 0.05 * np.sign(x[1])
+        return np.array([x[1], xdot2 + u / (m * L**2)])
+    theta = x[:, 0]
+    theta_dot = x[:, 1]
+    xdot2 = g / L * np.sin(theta) - 0.05 * np.sign(theta_dot)
+    xdot = np.array([theta_dot, xdot2 + u / (m * L**2)]).T
     return xdot
 
 
@@ -64,13 +77,13 @@ def dynamics2(x, u):
     z dodatkowym nieliniowym oporem.
 
     Parametry:
-        x : iterable (theta, theta_dot)
+        x : iterable (theta, theta_dot) lub ndarray (N, 2)
             Aktualny stan (kąt i prędkość kątowa)
-        u : float
+        u : float lub ndarray (N,)
             Moment siły (sterowanie)
 
     Zwraca:
-        xdot : ndarray
+        xdot : ndarray (2,) lub (N, 2)
             Pochodna stanu [theta_dot, theta_ddot]
 
     """
@@ -78,10 +91,17 @@ def dynamics2(x, u):
     m = 1.0
     g = 1.0
     L = 1.0
+    if x.ndim == 1:
+        return np.array([
+            x[1],
+            g / L * np.sin(x[0]) + (-0.1 * x[0]**3) + u / (m * L**2)
+        ])
+    theta = x[:, 0]
+    theta_dot = x[:, 1]
     xdot = np.array([
-        x[1],
-        g / L * np.sin(x[0]) + (-0.1 * x[0]**3) + u / (m * L**2)
-    ])
+        theta_dot,
+        g / L * np.sin(theta) + (-0.1 * theta**3) + u / (m * L**2)
+    ]).T
     return xdot
 
 
@@ -93,25 +113,33 @@ def dynamics3(x, u):
     z warunkiem braku grawitacji przy małych kątach.
 
     Parametry:
-        x : iterable (theta, theta_dot)
+        x : iterable (theta, theta_dot) lub ndarray (N, 2)
             Aktualny stan (kąt i prędkość kątowa)
-        u : float
+        u : float lub ndarray (N,)
             Moment siły (sterowanie)
 
     Zwraca:
-        xdot : ndarray
+        xdot : ndarray (2,) lub (N, 2)
             Pochodna stanu [theta_dot, theta_ddot]
     """
     x = np.asarray(x)
     m = 1.0
     g = 1.0
     L = 1.0
-    if abs(x[0]) < 0.7:
-        g = 0.0
+    if x.ndim == 1:
+        if abs(x[0]) < 0.7:
+            g = 0.0
+        return np.array([
+            x[1],
+            g / L * np.sin(x[0]) + u / (m * L**2)
+        ])
+    theta = x[:, 0]
+    theta_dot = x[:, 1]
+    g = np.where(np.abs(theta) < 0.7, 0.0, g)
     xdot = np.array([
-        x[1],
-        g / L * np.sin(x[0]) + u / (m * L**2)
-    ])
+        theta_dot,
+        g / L * np.sin(theta) + u / (m * L**2)
+    ]).T
     return xdot
 
 
@@ -123,27 +151,37 @@ def dynamics4(x, u):
     z dodatkowym oporem przy przekroczeniu pewnych kątów.
 
     Parametry:
-        x : iterable (theta, theta_dot)
+        x : iterable (theta, theta_dot) lub ndarray (N, 2)
             Aktualny stan (kąt i prędkość kątowa)
-        u : float
+        u : float lub ndarray (N,)
             Moment siły (sterowanie)
     Zwraca:
-        xdot : ndarray
+        xdot : ndarray (2,) lub (N, 2)
             Pochodna stanu [theta_dot, theta_ddot]
     """
     x = np.asarray(x)
     m = 1.0
     g = 1.0
     L = 1.0
-    xdot2 = 0.0
-    if x[0] < 0.7 and x[0] > 0.0:
-        xdot2 = 1.0 * (0.7 - x[0])
-    if x[0] > -0.7 and x[0] < 0.0:
-        xdot2 = 1.0 * (-0.7 - x[0])
+    if x.ndim == 1:
+        xdot2 = 0.0
+        if x[0] < 0.7 and x[0] > 0.0:
+            xdot2 = 1.0 * (0.7 - x[0])
+        if x[0] > -0.7 and x[0] < 0.0:
+            xdot2 = 1.0 * (-0.7 - x[0])
+        return np.array([
+            x[1],
+            g / L * np.sin(x[0]) + xdot2 + u / (m * L**2)
+        ])
+    theta = x[:, 0]
+    theta_dot = x[:, 1]
+    xdot2 = np.where((theta < 0.7) & (theta > 0.0), 1.0 * (0.7 - theta), 0.0)
+    xdot2 = np.where((theta > -0.7) & (theta < 0.0),
+                     1.0 * (-0.7 - theta), xdot2)
     xdot = np.array([
-        x[1],
-        g / L * np.sin(x[0]) + xdot2 + u / (m * L**2)
-    ])
+        theta_dot,
+        g / L * np.sin(theta) + xdot2 + u / (m * L**2)
+    ]).T
     return xdot
 
 
@@ -155,25 +193,33 @@ def dynamics5(x, u):
     z różną masą przy małych kątach.
 
     Parametry:
-        x : iterable (theta, theta_dot)
+        x : iterable (theta, theta_dot) lub ndarray (N, 2)
             Aktualny stan (kąt i prędkość kątowa)
-        u : float
+        u : float lub ndarray (N,)
             Moment siły (sterowanie)
 
     Zwraca:
-        xdot : ndarray
+        xdot : ndarray (2,) lub (N, 2)
             Pochodna stanu [theta_dot, theta_ddot]
     """
     x = np.asarray(x)
     m = 1.0
     g = 1.0
     L = 1.0
-    if abs(x[0]) < 0.7:
-        m = 10.0
+    if x.ndim == 1:
+        if abs(x[0]) < 0.7:
+            m = 10.0
+        return np.array([
+            x[1],
+            g / L * np.sin(x[0]) + u / (m * L**2)
+        ])
+    theta = x[:, 0]
+    theta_dot = x[:, 1]
+    m = np.where(np.abs(theta) < 0.7, 10.0, m)
     xdot = np.array([
-        x[1],
-        g / L * np.sin(x[0]) + u / (m * L**2)
-    ])
+        theta_dot,
+        g / L * np.sin(theta) + u / (m * L**2)
+    ]).T
     return xdot
 
 
@@ -186,13 +232,13 @@ def dynamics6(x, u):
 
     Parametry:
 
-        x : iterable (theta, theta_dot)
+        x : iterable (theta, theta_dot) lub ndarray (N, 2)
             Aktualny stan (kąt i prędkość kątowa)
-        u : float
+        u : float lub ndarray (N,)
             Moment siły (sterowanie)
 
     Zwraca:
-        xdot : ndarray
+        xdot : ndarray (2,) lub (N, 2)
             Pochodna stanu [theta_dot, theta_ddot]
 
     """
@@ -200,11 +246,19 @@ def dynamics6(x, u):
     m = 1.0
     g = 1.0
     L = 1.0
-    noise = 1.0 * np.random.randn()
+    if x.ndim == 1:
+        noise = 1.0 * np.random.randn()
+        return np.array([
+            x[1],
+            g / L * np.sin(x[0]) + u / (m * L**2) + noise
+        ])
+    theta = x[:, 0]
+    theta_dot = x[:, 1]
+    noise = 1.0 * np.random.randn(len(theta))
     xdot = np.array([
-        x[1],
-        g / L * np.sin(x[0]) + u / (m * L**2) + noise
-    ])
+        theta_dot,
+        g / L * np.sin(theta) + u / (m * L**2) + noise
+    ]).T
     return xdot
 
 
@@ -217,27 +271,35 @@ def dynamics7(x, u):
 
     Parametry:
 
-        x : iterable (theta, theta_dot)
+        x : iterable (theta, theta_dot) lub ndarray (N, 2)
             Aktualny stan (kąt i prędkość kątowa)
-        u : float
+        u : float lub ndarray (N,)
             Moment siły (sterowanie)
 
     Zwraca:
-        xdot : ndarray
+        xdot : ndarray (2,) lub (N, 2)
             Pochodna stanu [theta_dot, theta_ddot]
     """
     x = np.asarray(x)
     m = 1.0
     g = 1.0
     L = 1.0
-    if x[0] > 0.7:
-        L = 0.5
-    elif x[0] < -0.7:
-        L = 0.5
+    if x.ndim == 1:
+        if x[0] > 0.7:
+            L = 0.5
+        elif x[0] < -0.7:
+            L = 0.5
+        return np.array([
+            x[1],
+            g / L * np.sin(x[0]) + u / (m * L**2)
+        ])
+    theta = x[:, 0]
+    theta_dot = x[:, 1]
+    L = np.where((theta > 0.7) | (theta < -0.7), 0.5, L)
     xdot = np.array([
-        x[1],
-        g / L * np.sin(x[0]) + u / (m * L**2)
-    ])
+        theta_dot,
+        g / L * np.sin(theta) + u / (m * L**2)
+    ]).T
     return xdot
 
 
@@ -249,21 +311,237 @@ def dynamicsS(x, u):
     z dodatkowym oporem i zmienną długością wahadła.
 
     Parametry:
-        x : iterable (theta, theta_dot)
+        x : iterable (theta, theta_dot) lub ndarray (N, 2)
             Aktualny stan (kąt i prędkość kątowa)
-        u : float
+        u : float lub ndarray (N,)
             Moment siły (sterowanie)
 
     Zwraca:
-        xdot : ndarray
+        xdot : ndarray (2,) lub (N, 2)
             Pochodna stanu [theta_dot, theta_ddot]
     """
     x = np.asarray(x)
     m = 1.0  # noqa TODO: sprawdzić, czy m jest potrzebne
     g = 1.0
     L = 1.0 + 0.5 * u
+    if x.ndim == 1:
+        return np.array([
+            x[1],
+            g / L * np.sin(x[0]) - 0.005 * x[1]
+        ])
+    theta = x[:, 0]
+    theta_dot = x[:, 1]
     xdot = np.array([
-        x[1],
-        g / L * np.sin(x[0]) - 0.005 * x[1]
-    ])
+        theta_dot,
+        g / L * np.sin(theta) - 0.005 * theta_dot
+    ]).T
     return xdot
+
+
+# Wersje skalarne modeli: argumenty i wyniki to liczby float Pythona, bez
+# tworzenia tablic. Używane przez toolbox.rk_4 dla pojedynczego stanu;
+# kolejność działań odpowiada wersjom tablicowym, więc wyniki są identyczne.
+
+def _dynamics0_scalar(theta, theta_dot, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    return theta_dot, (g / L) * math.sin(theta) + u / (m * L**2)
+
+
+def _dynamics1_scalar(theta, theta_dot, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    sign = (theta_dot > 0) - (theta_dot < 0)
+    xdot2 = g / L * math.sin(theta) - 0.05 * sign
+    return theta_dot, xdot2 + u / (m * L**2)
+
+
+def _dynamics2_scalar(theta, theta_dot, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    return theta_dot, (g / L * math.sin(theta) + (-0.1 * theta**3)
+                       + u / (m * L**2))
+
+
+def _dynamics3_scalar(theta, theta_dot, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    if abs(theta) < 0.7:
+        g = 0.0
+    return theta_dot, g / L * math.sin(theta) + u / (m * L**2)
+
+
+def _dynamics4_scalar(theta, theta_dot, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    xdot2 = 0.0
+    if theta < 0.7 and theta > 0.0:
+        xdot2 = 1.0 * (0.7 - theta)
+    if theta > -0.7 and theta < 0.0:
+        xdot2 = 1.0 * (-0.7 - theta)
+    return theta_dot, g / L * math.sin(theta) + xdot2 + u / (m * L**2)
+
+
+def _dynamics5_scalar(theta, theta_dot, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    if abs(theta) < 0.7:
+        m = 10.0
+    return theta_dot, g / L * math.sin(theta) + u / (m * L**2)
+
+
+def _dynamics6_scalar(theta, theta_dot, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    noise = 1.0 * np.random.randn()
+    return theta_dot, g / L * math.sin(theta) + u / (m * L**2) + noise
+
+
+def _dynamics7_scalar(theta, theta_dot, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    if theta > 0.7 or theta < -0.7:
+        L = 0.5
+    return theta_dot, g / L * math.sin(theta) + u / (m * L**2)
+
+
+def _dynamicsS_scalar(theta, theta_dot, u):
+    g = 1.0
+    L = 1.0 + 0.5 * u
+    return theta_dot, g / L * math.sin(theta) - 0.005 * theta_dot
+
+
+dynamics0.scalar = _dynamics0_scalar
+dynamics1.scalar = _dynamics1_scalar
+dynamics2.scalar = _dynamics2_scalar
+dynamics3.scalar = _dynamics3_scalar
+dynamics4.scalar = _dynamics4_scalar
+dynamics5.scalar = _dynamics5_scalar
+dynamics6.scalar = _dynamics6_scalar
+dynamics7.scalar = _dynamics7_scalar
+dynamicsS.scalar = _dynamicsS_scalar
+
+# Wszystkie modele przyjmują również stany (N, 2) i sterowania (N,);
+# pojedynczy stan (2,) liczony jest bez np.where i transpozycji, więc
+# wywołania skalarne nie płacą za ścieżkę wsadową
+for _dynamics in (dynamics0, dynamics1, dynamics2, dynamics3, dynamics4,
+                  dynamics5, dynamics6, dynamics7, dynamicsS):
+    _dynamics.batched = True
+
+# Model z losowym zaburzeniem - następnik stanu nie jest deterministyczny
+dynamics6.stochastic = True
+
+
+# Jakobiany analityczne: dla stanów X (N, 2) i sterowań U (N,) zwracają
+# A = df/dx o kształcie (N, 2, 2) i B = df/du o kształcie (N, 2, 1). W
+# modelach przedziałami gładkich pochodna liczona jest wewnątrz przedziału
+# (skoki na granicach przedziałów są pomijane), a dla modelu z zaburzeniem
+# losowym - dla jego części deterministycznej.
+
+def _jacobian(a21, a22, b2):
+    """
+    Macierze A, B dla f = [theta_dot, f2], gdzie a21 = df2/dθ,
+    a22 = df2/d(dθ/dt), b2 = df2/du (tablice (N,) lub skalary).
+    """
+    a21, a22, b2 = np.broadcast_arrays(a21, a22, b2)
+    A = np.zeros(a21.shape + (2, 2))
+    A[..., 0, 1] = 1.0
+    A[..., 1, 0] = a21
+    A[..., 1, 1] = a22
+    B = np.zeros(a21.shape + (2, 1))
+    B[..., 1, 0] = b2
+    return A, B
+
+
+def _dynamics0_jacobian(x, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    theta = np.asarray(x).T[0]
+    return _jacobian(g / L * np.cos(theta), 0.0, 1.0 / (m * L**2))
+
+
+def _dynamics1_jacobian(x, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    theta = np.asarray(x).T[0]
+    return _jacobian(g / L * np.cos(theta), 0.0, 1.0 / (m * L**2))
+
+
+def _dynamics2_jacobian(x, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    theta = np.asarray(x).T[0]
+    return _jacobian(g / L * np.cos(theta) - 0.3 * theta**2, 0.0,
+                     1.0 / (m * L**2))
+
+
+def _dynamics3_jacobian(x, u):
+    m = 1.0
+    L = 1.0
+    theta = np.asarray(x).T[0]
+    g = np.where(np.abs(theta) < 0.7, 0.0, 1.0)
+    return _jacobian(g / L * np.cos(theta), 0.0, 1.0 / (m * L**2))
+
+
+def _dynamics4_jacobian(x, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    theta = np.asarray(x).T[0]
+    # odbojniki: -1 dla 0 < |θ| < 0.7
+    bumper = np.where((np.abs(theta) < 0.7) & (theta != 0.0), -1.0, 0.0)
+    return _jacobian(g / L * np.cos(theta) + bumper, 0.0, 1.0 / (m * L**2))
+
+
+def _dynamics5_jacobian(x, u):
+    g = 1.0
+    L = 1.0
+    theta = np.asarray(x).T[0]
+    m = np.where(np.abs(theta) < 0.7, 10.0, 1.0)
+    return _jacobian(g / L * np.cos(theta), 0.0, 1.0 / (m * L**2))
+
+
+def _dynamics6_jacobian(x, u):
+    m = 1.0
+    g = 1.0
+    L = 1.0
+    theta = np.asarray(x).T[0]
+    return _jacobian(g / L * np.cos(theta), 0.0, 1.0 / (m * L**2))
+
+
+def _dynamics7_jacobian(x, u):
+    m = 1.0
+    g = 1.0
+    theta = np.asarray(x).T[0]
+    L = np.where((theta > 0.7) | (theta < -0.7), 0.5, 1.0)
+    return _jacobian(g / L * np.cos(theta), 0.0, 1.0 / (m * L**2))
+
+
+def _dynamicsS_jacobian(x, u):
+    g = 1.0
+    L = 1.0 + 0.5 * np.asarray(u)
+    theta = np.asarray(x).T[0]
+    return _jacobian(g / L * np.cos(theta), -0.005,
+                     -0.5 * g * np.sin(theta) / L**2)
+
+
+dynamics0.jacobian = _dynamics0_jacobian
+dynamics1.jacobian = _dynamics1_jacobian
+dynamics2.jacobian = _dynamics2_jacobian
+dynamics3.jacobian = _dynamics3_jacobian
+dynamics4.jacobian = _dynamics4_jacobian
+dynamics5.jacobian = _dynamics5_jacobian
+dynamics6.jacobian = _dynamics6_jacobian
+dynamics7.jacobian = _dynamics7_jacobian
+dynamicsS.jacobian = _dynamicsS_jacobian
@@ -0,0 +1,192 @@
+"""
+Ocena strategii bez interfejsu graficznego.
+
+Strategia U zapisana w pliku (.npz lub dawny .pkl) jest symulowana
+jednocześnie z siatki warunków początkowych (kąt x prędkość kątowa) przy
+użyciu wsadowych modeli dynamiki. Dla każdego warunku początkowego
+wyznaczane są: sukces (osiągnięcie otoczenia pionu i utrzymanie go przez
+hold_time), czas dojścia do pionu oraz wysiłek sterowania (całka u^2).
+Mapa sukcesu to obszar przyciągania strategii.
+
+Wyniki zapisywane są do <prefix>.npz oraz jako obraz <prefix>.png.
+
+Uruchomienie:
+    python evaluation.py Learn_X.npz [--n-fi N] [--n-om N] [--om-max W]
+                         [--time T] [-o prefiks]
+"""
+import argparse
+
+import numpy as np
+
+from checkpoint import load_policy
+from policy import Policy
+from toolbox import get_integrator, normalize_fi_batch
+
+
+def initial_states(n_fi=91, n_om=61, om_max=np.pi):
+    """
+    Siatka warunków początkowych.
+
+    Zwraca:
+        fi0 : ndarray
+            Kąty początkowe [rad] z zakresu [-π, π)
+        om0 : ndarray
+            Prędkości początkowe [rad/s] z zakresu [-om_max, om_max]
+    """
+    fi0 = np.linspace(-np.pi, np.pi, n_fi, endpoint=False)
+    om0 = np.linspace(-om_max, om_max, n_om)
+    return fi0, om0
+
+
+def evaluate_policy(policy, fi0, om0, t_max=20.0, dt=None,
+                    angle_tol=0.05, rate_tol=0.1, hold_time=1.0,
+                    interpolate=False):
+    """
+    Symulacja strategii z wszystkich par (fi0[i], om0[j]) naraz.
+
+    Parametry:
+        policy : dict
+            Strategia jak z checkpoint.load_policy
+        fi0, om0 : array-like
+            Kąty i prędkości początkowe
+        t_max : float
+            Czas symulacji [s]
+        dt : float lub None
+            Krok symulacji (None - krok z uczenia)
+        angle_tol, rate_tol : float
+            Otoczenie pionu: |θ| < angle_tol i |dθ/dt| < rate_tol
+        hold_time : float
+            Czas utrzymania pionu wymagany do sukcesu [s]
+        interpolate : bool
+            Sterowanie z dwuliniowej interpolacji Q (Policy)
+
+    Zwraca:
+        dict: tablice o kształcie (len(fi0), len(om0)) - 'success',
+        'time_to_upright' (NaN bez sukcesu), 'effort' (całka u^2 do
+        chwili sukcesu lub końca symulacji), 'final_state' - oraz
+        podsumowanie 'success_rate', 'mean_time', 'mean_effort'
+    """
+    fi0 = np.asarray(fi0, dtype=float)
+    om0 = np.asarray(om0, dtype=float)
+    dt = policy['dt'] if dt is None else dt
+    greedy = Policy.from_policy(policy, interpolate)
+    dynamics = policy['DynamicsAct']
+    _, step = get_integrator(policy.get('integrator', 'rk4'),
+                             policy.get('substeps', 1))
+
+    X = np.column_stack([np.repeat(fi0, len(om0)),
+                         np.tile(om0, len(fi0))])
+    n = len(X)
+    maxit = int(round(t_max / dt))
+    hold_steps = max(1, int(round(hold_time / dt)))
+
+    streak = np.zeros(n, dtype=np.intp)  # kolejne kroki w otoczeniu pionu
+    time_to_upright = np.full(n, np.nan)
+    effort = np.zeros(n)
+    active = np.arange(n)  # warunki początkowe bez rozstrzygnięcia
+
+    for timestep in range(maxit):
+        x = X[active]
+        u = greedy.control_batch(x)
+        effort[active] += u**2 * dt
+        x = step(dynamics, dt, x, u)
+        x[:, 0] = normalize_fi_batch(x[:, 0])
+        X[active] = x
+
+        upright = (np.abs(x[:, 0]) < angle_tol) & (np.abs(x[:, 1]) < rate_tol)
+        streak[active] = np.where(upright, streak[active] + 1, 0)
+        held = streak[active] >= hold_steps
+        if np.any(held):
+            done = active[held]
+            # czas pierwszego kroku w otoczeniu pionu
+            time_to_upright[done] = (timestep + 2 - hold_steps) * dt
+            active = active[~held]
+            if len(active) == 0:
+                break
+
+    shape = (len(fi0), len(om0))
+    success = ~np.isnan(time_to_upright)
+    return {
+        'fi0': fi0,
+        'om0': om0,
+        'success': success.reshape(shape),
+        'time_to_upright': time_to_upright.reshape(shape),
+        'effort': effort.reshape(shape),
+        'final_state': X.reshape(shape + (2,)),
+        'dt': dt,
+        't_max': t_max,
+        'success_rate': float(np.mean(success)),
+        'mean_time': (float(np.mean(time_to_upright[success]))
+                      if np.any(success) else float('nan')),
+        'mean_effort': float(np.mean(effort)),
+    }
+
+
+def plot_evaluation(results, title=''):
+    """
+    Rysunek: obszar przyciągania, czas dojścia do pionu i wysiłek
+    sterowania na płaszczyźnie warunków początkowych.
+
+    Zwraca:
+        matplotlib.figure.Figure
+    """
+    # Figure bez pyplot - działa bez ekranu i bez okien
+    from matplotlib.figure import Figure
+
+    fi0, om0 = results['fi0'], results['om0']
+    fig = Figure(figsize=(13, 4))
+    axs = fig.subplots(1, 3)
+    panels = [
+        ('success', 'Obszar przyciągania', 'RdYlGn'),
+        ('time_to_upright', 'Czas dojścia do pionu [s]', 'viridis'),
+        ('effort', 'Wysiłek sterowania ∫u² dt', 'magma'),
+    ]
+    for ax, (key, label, cmap) in zip(axs, panels):
+        data = results[key].astype(float).T
+        mesh = ax.pcolormesh(fi0, om0, data, cmap=cmap, shading='nearest')
+        fig.colorbar(mesh, ax=ax)
+        ax.set_title(label)
+        ax.set_xlabel('θ₀ [rad]')
+        ax.set_ylabel('dθ/dt₀ [rad/s]')
+    fig.suptitle(
+        f"{title} sukces: {100 * results['success_rate']:.1f}%, "
+        f"średni czas: {results['mean_time']:.2f} s, "
+        f"średni wysiłek: {results['mean_effort']:.2f}")
+    fig.tight_layout()
+    return fig
+
+
+def save_evaluation(results, prefix, title=''):
+    """Zapis wyników do <prefix>.npz i obrazu <prefix>.png."""
+    np.savez(f"{prefix}.npz", **results)
+    plot_evaluation(results, title).savefig(f"{prefix}.png", dpi=100)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Ocena strategii z siatki warunków początkowych")
+    parser.add_argument('policy', help="plik strategii (.npz lub .pkl)")
+    parser.add_argument('--n-fi', type=int, default=91,
+                        help="liczba kątów początkowych")
+    parser.add_argument('--n-om', type=int, default=61,
+                        help="liczba prędkości początkowych")
+    parser.add_argument('--om-max', type=float, default=np.pi,
+                        help="zakres prędkości początkowych [rad/s]")
+    parser.add_argument('--time', type=float, default=20.0,
+                        help="czas symulacji [s]")
+    parser.add_argument('--interpolate', action='store_true',
+                        help="dwuliniowa interpolacja Q")
+    parser.add_argument('-o', '--output', default=None,
+                        help="prefiks plików wynikowych")
+    args = parser.parse_args()
+
+    policy = load_policy(args.policy)
+    results = evaluate_policy(policy, *initial_states(
+        args.n_fi, args.n_om, args.om_max), t_max=args.time,
+        interpolate=args.interpolate)
+    prefix = args.output or f"Eval_{policy['StudInd']}"
+    save_evaluation(results, prefix,
+                    title=f"{policy['StudInd']} ({policy['DynName']}):")
+    print(f"Sukces: {100 * results['success_rate']:.1f}%, "
+          f"średni czas dojścia: {results['mean_time']:.2f} s, "
+          f"średni wysiłek: {results['mean_effort']:.2f}")
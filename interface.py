@@ -13,6 +13,12 @@ class QLearnDialog(tk.Tk):
         self.options = {
             "Nazwa zadania": tasks_names,
             "Typ sterowania": controls_names,
+            "Wznów tylko Q (start na ciepło)": [True, False],
+            "Profilowanie faz uczenia": [True, False],
+            "Typ danych Q": ['float64', 'float32', 'float16'],
+            "Integrator": ['rk4', 'semi_implicit_euler', 'euler'],
+            "Metoda uczenia": ['qlearning', 'sarsa', 'sarsa_lambda',
+                               'q_lambda'],
         }
         self.defaults = {
             "Etykieta Rozwiązania": "Run 0",
@@ -29,6 +35,29 @@ class QLearnDialog(tk.Tk):
             "epsilDecay": "1.0",
             "Krok Czasowy": "0.1",
             "Maksymalna liczba epizodów": "15000",
+            "Wznów z pliku (.npz)": "",
+            "Wznów tylko Q (start na ciepło)": False,
+            "Profilowanie faz uczenia": False,
+            "Tolerancja zbieżności (rel_tol)": "",
+            "Okno zbieżności [epizody]": "100",
+            "Stała strategia przez [epizody]": "",
+            "Limit czasu [s]": "",
+            "Limit kroków": "",
+            "Krok siatki kąta (dx1)": "0.025",
+            "Krok siatki prędkości (dx2)": "0.05",
+            "Prędkość min [rad/s] (puste: -π)": "",
+            "Prędkość max [rad/s] (puste: π)": "",
+            "Zagęszczenie siatki kąta przy zerze": "0.0",
+            "Zagęszczenie siatki prędkości przy zerze": "0.0",
+            "Typ danych Q": 'float64',
+            "Integrator": 'rk4',
+            "Podkroki integratora": "1",
+            "Liczba procesów uczenia (wspólne Q)": "1",
+            "Kroki planowania Dyna-Q (K)": "0",
+            "Metoda uczenia": 'qlearning',
+            "Lambda (ślady aktywności)": "0.9",
+            "Punkt kontrolny co [epizody]": "10",
+            "Punkt kontrolny co [s]": "",
         }
         self.result = None
         self._build()
@@ -79,15 +108,25 @@ class SimulDialog(tk.Toplevel):
         self.options = {
             "Sterowanie LQR": [True, False],
             "Trwały slad na wykresie stanu": [True, False],
+            "Symulacja bez ograniczenia prędkości": [True, False],
+            "Zapis trajektorii": [True, False],
+            "Interpolacja Q": [True, False],
         }
         self.defaults = {
             "Sterowanie LQR": False,
             "fi_0": "180.0",
             "om_0": "0.0",
             "dt": "0.1",
-            "dt_delay": "0.05",
+            "Klatki na sekundę (FPS)": "30",
             "maxit": "20000",
             "Trwały slad na wykresie stanu": False,
+            "Obszar LQR: |θ| [deg] (puste - bez ograniczeń)": "",
+            "Obszar LQR: |dθ/dt| [rad/s] (puste - bez ograniczeń)": "",
+            "Współczynnik czasu rzeczywistego": "1.0",
+            "Symulacja bez ograniczenia prędkości": False,
+            "Zapis trajektorii": False,
+            "Interpolacja Q": False,
+            "Trwały ślad: liczba ostatnich punktów": "5000",
         }
         self.result = None
         self._build()
@@ -147,3 +186,9 @@ def enter_interface_simulation(parent=None):
     if own_root is not None:
         own_root.destroy()
     return result
+
+
+def optional(text, cast, default=None):
+    """Pole opcjonalne dialogu: pusty tekst oznacza wartość domyślną."""
+    text = str(text).strip()
+    return cast(text) if text else default
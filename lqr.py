@@ -0,0 +1,203 @@
+"""
+Regulator LQR z pamięcią podręczną wzmocnień.
+
+Model dynamiki linearyzowany jest w punkcie siatki stanu (komórce), a
+równanie Riccatiego (CARE) rozwiązywane jest raz dla każdej komórki.
+Wzmocnienia przechowywane są w pamięci LRU albo w pełnej tablicy
+wzmocnień dla całej siatki, którą można zapisać obok pliku strategii
+(<strategia>_lqr.npz) i wczytać przy następnej symulacji.
+
+Uruchomienie (wyznaczenie i zapis tablicy wzmocnień):
+    python lqr.py Learn_X.npz
+"""
+import argparse
+import functools
+import os
+
+import numpy as np
+from scipy.linalg import solve_continuous_are as care
+
+from toolbox import StateGrid, linearize_batch
+
+
+def lqr_gain(A, B, QQ, RR):
+    """
+    Wzmocnienie K = R⁻¹ Bᵀ P, gdzie P rozwiązuje
+    Aᵀ P + P A - P B R⁻¹ Bᵀ P + Q = 0.
+
+    Zwraca:
+        ndarray lub None: K o kształcie (m, n); None, jeżeli CARE nie ma
+        rozwiązania (np. układ nie jest stabilizowalny)
+    """
+    try:
+        P = care(A, B, QQ, RR)
+    except (np.linalg.LinAlgError, ValueError):
+        return None
+    K = np.linalg.solve(RR, B.T @ P)
+    if not np.all(np.isfinite(K)):
+        return None
+    return K
+
+
+def gain_table_path(policy_path):
+    """Ścieżka tablicy wzmocnień zapisywanej obok pliku strategii."""
+    return os.path.splitext(policy_path)[0] + '_lqr.npz'
+
+
+class LQRController:
+    """
+    Regulator u = -K x z wzmocnieniem K wyznaczanym dla komórki siatki.
+
+    Linearyzacja odbywa się w punkcie siatki komórki, przy sterowaniu
+    u_lin[k] (domyślnie sterowanie strategii Q w tej komórce, tak jak
+    linearyzacja w air_simul). Wzmocnienia są pamiętane w pamięci LRU o
+    rozmiarze cache_size lub w tablicy wyznaczonej przez gain_table().
+    Jeżeli CARE nie ma rozwiązania, control() zwraca None, a symulacja
+    używa sterowania strategii Q.
+
+    Parametry:
+        dynamics : callable
+            Model dynamiki
+        x1, x2 : array-like
+            Siatka stanu
+        u_lin : array-like lub None
+            Sterowanie linearyzacji dla każdej komórki (None - zero)
+        u_max : float
+            Ograniczenie sterowania
+        QQ, RR : array-like
+            Macierze wag stanu i sterowania
+        switch : tuple lub None
+            Obszar przełączenia (kąt [rad], prędkość [rad/s]): LQR działa
+            tylko dla (θ/kąt)² + (dθ/dt/prędkość)² <= 1, poza nim
+            control() zwraca None. None - LQR w całej przestrzeni stanu.
+        cache_size : int
+            Rozmiar pamięci LRU wzmocnień
+    """
+
+    def __init__(self, dynamics, x1, x2, u_lin=None, u_max=1.0,
+                 QQ=np.eye(2), RR=np.eye(1), switch=None, cache_size=4096):
+        self.dynamics = dynamics
+        self.grid = StateGrid(x1, x2)
+        self.u_lin = (np.zeros(self.grid.n_states) if u_lin is None
+                      else np.asarray(u_lin, dtype=float))
+        self.u_max = u_max
+        self.QQ = np.asarray(QQ, dtype=float)
+        self.RR = np.asarray(RR, dtype=float)
+        self.switch = switch
+        self.table = None
+        self._cell_gain = functools.lru_cache(maxsize=cache_size)(
+            self._solve_cell)
+
+    def _solve_cell(self, k):
+        A, B = linearize_batch(self.dynamics, [self.grid.point(k)],
+                               self.u_lin[k])
+        return lqr_gain(A[0], B[0], self.QQ, self.RR)
+
+    def linearize_grid(self):
+        """
+        Linearyzacja modelu we wszystkich punktach siatki naraz.
+
+        Zwraca:
+            A : ndarray
+                (n_states, 2, 2)
+            B : ndarray
+                (n_states, 2, 1)
+        """
+        grid = self.grid
+        X = np.column_stack([np.repeat(grid.x1, grid.n_x2),
+                             np.tile(grid.x2, grid.n_x1)])
+        return linearize_batch(self.dynamics, X, self.u_lin)
+
+    def gain(self, k):
+        """Wzmocnienie K (1, 2) dla komórki k lub None."""
+        if self.table is not None:
+            K = self.table[k]
+            return None if np.isnan(K[0]) else K[None, :]
+        return self._cell_gain(int(k))
+
+    def in_switch_region(self, x):
+        if self.switch is None:
+            return True
+        angle, rate = self.switch
+        return (x[0] / angle)**2 + (x[1] / rate)**2 <= 1.0
+
+    def control(self, x, k=None):
+        """
+        Sterowanie LQR w stanie x (k - indeks komórki, jeżeli znany).
+
+        Zwraca:
+            float lub None: None poza obszarem przełączenia lub gdy CARE
+            nie ma rozwiązania
+        """
+        if not self.in_switch_region(x):
+            return None
+        K = self.gain(self.grid.index(x) if k is None else k)
+        if K is None:
+            return None
+        u = -(K[0, 0] * x[0] + K[0, 1] * x[1])
+        return float(np.clip(u, -self.u_max, self.u_max))
+
+    def cache_info(self):
+        return self._cell_gain.cache_info()
+
+    def gain_table(self):
+        """
+        Wyznacza wzmocnienia dla wszystkich komórek siatki.
+
+        Zwraca:
+            ndarray: (n_states, 2); wiersze NaN dla komórek bez
+            rozwiązania CARE
+        """
+        table = np.full((self.grid.n_states, 2), np.nan)
+        A, B = self.linearize_grid()
+        for k in range(self.grid.n_states):
+            K = lqr_gain(A[k], B[k], self.QQ, self.RR)
+            if K is not None:
+                table[k] = K[0]
+        self.table = table
+        return table
+
+    def save_table(self, path):
+        """Zapis tablicy wzmocnień (wyznaczanej w razie potrzeby)."""
+        if self.table is None:
+            self.gain_table()
+        np.savez(path, K=self.table, x1=self.grid.x1, x2=self.grid.x2,
+                 u_lin=self.u_lin, QQ=self.QQ, RR=self.RR)
+
+    def load_table(self, path):
+        """
+        Wczytanie tablicy wzmocnień; zwraca False, jeżeli plik powstał dla
+        innej siatki, sterowania linearyzacji lub wag.
+        """
+        with np.load(path) as data:
+            same = (np.array_equal(data['x1'], self.grid.x1)
+                    and np.array_equal(data['x2'], self.grid.x2)
+                    and np.array_equal(data['u_lin'], self.u_lin)
+                    and np.array_equal(data['QQ'], self.QQ)
+                    and np.array_equal(data['RR'], self.RR))
+            if same:
+                self.table = data['K']
+        return same
+
+
+def controller_for_policy(policy, **kwargs):
+    """Regulator LQR linearyzowany wzdłuż strategii z load_policy."""
+    return LQRController(policy['DynamicsAct'], policy['x1'], policy['x2'],
+                         u_lin=policy['U'], u_max=policy['u_max'], **kwargs)
+
+
+if __name__ == "__main__":
+    from checkpoint import load_policy
+
+    parser = argparse.ArgumentParser(
+        description="Tablica wzmocnień LQR dla siatki strategii")
+    parser.add_argument('policy', help="plik strategii (.npz lub .pkl)")
+    args = parser.parse_args()
+
+    controller = controller_for_policy(load_policy(args.policy))
+    table = controller.gain_table()
+    path = gain_table_path(args.policy)
+    controller.save_table(path)
+    failed = np.count_nonzero(np.isnan(table[:, 0]))
+    print(f"Zapisano {path}: {len(table)} komórek, "
+          f"bez rozwiązania CARE: {failed}")
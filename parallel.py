@@ -0,0 +1,252 @@
+"""
+Równoległe uczenie Q w kilku procesach ze wspólną tablicą Q.
+
+Procesy robocze prowadzą epizody niezależnie (własne stany i generatory
+losowe), ale aktualizują jedną tablicę Q umieszczoną w
+multiprocessing.shared_memory - bez blokad (Hogwild) albo z blokadami
+pasów wierszy (n_locks > 0). Rzadkie zgubienie jednej z dwóch
+jednoczesnych aktualizacji tej samej pary (stan, sterowanie) nie wpływa
+istotnie na zbieżność, a brak synchronizacji pozwala skalować liczbę
+kroków na sekundę z liczbą rdzeni.
+
+Proces nadrzędny (koordynator) przydziela numery epizodów, liczy
+statystyki (V, U, Vmean, ...) na podstawie wspólnej tablicy wierszy
+zmienionych, sprawdza kryteria zatrzymania i wywołuje obserwatorów
+(punkty kontrolne, wykresy) - tak jak QLearnTrainer.run().
+
+Uruchomienie:
+    python parallel.py [-w liczba_procesów] [--locks N] [--episodes N]
+                       [-o Learn_parallel.npz]
+"""
+import argparse
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from trainer import make_trainer
+
+
+def _attach(name, shape, dtype):
+    """Widok numpy na istniejący blok pamięci współdzielonej."""
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _worker(config, q_spec, dirty_spec, counters, locks, stop, seed):
+    """
+    Proces roboczy: pobiera kolejne numery epizodów i wykonuje je na
+    wspólnej tablicy Q.
+    """
+    claimed, done, steps = counters
+    trainer = make_trainer(config)
+    shm_q, trainer.Q = _attach(*q_spec)
+    shm_dirty, trainer._dirty = _attach(*dirty_spec)
+    trainer.locks = locks
+    np.random.seed(seed)
+    epsil, epsilDecay = trainer.epsil, trainer.epsilDecay
+    try:
+        while not stop.is_set():
+            with claimed.get_lock():
+                if claimed.value >= trainer.maxEpisodes:
+                    break
+                claimed.value += 1
+            # epsilon jak w uczeniu sekwencyjnym: zanik na każdy wspólny krok
+            trainer.epsil = epsil * epsilDecay ** steps.value
+            n = trainer.run_episode()
+            with steps.get_lock():
+                steps.value += n
+            with done.get_lock():
+                done.value += 1
+    finally:
+        # widoki muszą zniknąć przed zamknięciem bloków pamięci
+        trainer.Q = trainer._dirty = None
+        shm_q.close()
+        shm_dirty.close()
+
+
+class ParallelTrainer:
+    """
+    Uczenie Q w n_workers procesach ze wspólną tablicą Q.
+
+    Koordynator przechowuje zwykłego trenera (self.trainer), którego Q i
+    tablica zmienionych wierszy na czas uczenia umieszczane są w pamięci
+    współdzielonej. Obserwatorzy otrzymują tego trenera, więc
+    CheckpointWriter, LearningPlot i resume_training działają bez zmian.
+    Statystyki i obserwatorzy wywoływani są co poll_interval sekund, o ile
+    zakończył się co najmniej jeden epizod; licznik trainer.episode rośnie
+    wtedy skokami.
+
+    Parametry:
+        config : dict
+            Konfiguracja jak trainer.DEFAULT_CONFIG
+        n_workers : int
+            Liczba procesów roboczych
+        n_locks : int
+            Liczba blokad pasów wierszy Q (0 - aktualizacje bez blokad)
+        observers : list
+            Obserwatorzy wywoływani przez koordynatora
+        seed : int lub None
+            Ziarno generatorów losowych procesów roboczych
+        poll_interval : float
+            Odstęp odczytu postępu przez koordynatora [s]
+    """
+
+    def __init__(self, config, n_workers=None, n_locks=0, observers=None,
+                 seed=None, poll_interval=0.05):
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        if not (n_workers >= 1):
+            raise ValueError("n_workers must be a positive integer.")
+        if not (n_locks >= 0):
+            raise ValueError("n_locks must be non-negative.")
+        self.trainer = make_trainer(config, observers)
+        self.config = dict(self.trainer.config, profile=False)
+        self.n_workers = int(n_workers)
+        self.n_locks = int(n_locks)
+        self.seed = seed
+        self.poll_interval = poll_interval
+
+    def add_observer(self, observer):
+        self.trainer.add_observer(observer)
+
+    def _share(self, name):
+        """Przeniesienie tablicy trenera do pamięci współdzielonej."""
+        array = getattr(self.trainer, name)
+        shm = shared_memory.SharedMemory(create=True,
+                                         size=max(array.nbytes, 1))
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+        shared[...] = array
+        setattr(self.trainer, name, shared)
+        return shm, (shm.name, array.shape, array.dtype)
+
+    def _unshare(self, name, shm):
+        """Kopia tablicy z pamięci współdzielonej i zwolnienie bloku."""
+        setattr(self.trainer, name, np.array(getattr(self.trainer, name)))
+        shm.close()
+        shm.unlink()
+
+    def _sync(self, done, steps):
+        """
+        Statystyki, kryteria zatrzymania i obserwatorzy po zakończeniu
+        kolejnych epizodów (done - łączna liczba epizodów, steps - kroki
+        wykonane w tym przebiegu).
+        """
+        trainer = self.trainer
+        trainer.steps = trainer.updates = self._steps0 + steps
+        trainer.epsil = self._epsil0 * trainer.epsilDecay ** steps
+        trainer.episode = done - 1
+        trainer.update_statistics()
+        trainer.episodes_done = done
+        trainer.elapsed = time.time() - self._start_time
+        trainer.stop_reason = trainer.check_stopping()
+        if done >= trainer.maxEpisodes:
+            trainer.stop_reason = trainer.stop_reason or 'maxEpisodes'
+        trainer.notify_observers()
+        trainer.episode = done
+        if trainer.stop_requested:
+            trainer.stop_reason = trainer.stop_reason or 'user'
+
+    def run(self):
+        """
+        Uczenie aż do maxEpisodes epizodów, spełnienia kryterium
+        zatrzymania lub żądania zatrzymania.
+
+        Zwraca:
+            dict: wyniki jak QLearnTrainer.results() oraz 'workers'
+        """
+        trainer = self.trainer
+        trainer.stop_requested = False
+        trainer.stop_reason = None
+        trainer.refresh_statistics()
+        self._start_time = time.time() - trainer.elapsed
+        self._epsil0 = trainer.epsil
+        self._steps0 = trainer.steps
+
+        ctx = multiprocessing.get_context()
+        claimed = ctx.Value('q', trainer.episode)
+        done = ctx.Value('q', trainer.episode)
+        steps = ctx.Value('q', 0)  # kroki wykonane w tym przebiegu
+        stop = ctx.Event()
+        locks = [ctx.Lock() for _ in range(self.n_locks)] or None
+        # procesy robocze startują z bieżącym epsilonem trenera
+        config = dict(self.config, epsil=trainer.epsil)
+        seeds = np.random.SeedSequence(self.seed).generate_state(
+            self.n_workers)
+
+        shm_q, q_spec = self._share('Q')
+        shm_dirty, dirty_spec = self._share('_dirty')
+        workers = []
+        try:
+            for k in range(self.n_workers):
+                p = ctx.Process(
+                    target=_worker,
+                    args=(config, q_spec, dirty_spec,
+                          (claimed, done, steps), locks, stop,
+                          int(seeds[k])),
+                    daemon=True)
+                p.start()
+                workers.append(p)
+
+            synced = trainer.episode
+            while True:
+                time.sleep(self.poll_interval)
+                alive = any(p.is_alive() for p in workers)
+                n_done = done.value
+                if n_done > synced:
+                    synced = n_done
+                    self._sync(n_done, steps.value)
+                    if trainer.stop_reason is not None:
+                        break
+                if not alive:
+                    break
+        finally:
+            stop.set()
+            for p in workers:
+                p.join()
+            try:
+                # epizody zakończone po ostatniej synchronizacji
+                if done.value > trainer.episodes_done:
+                    trainer.steps = trainer.updates = (self._steps0
+                                                       + steps.value)
+                    trainer.episodes_done = trainer.episode = done.value
+                    trainer.update_statistics()
+            finally:
+                self._unshare('Q', shm_q)
+                self._unshare('_dirty', shm_dirty)
+
+        return self.results()
+
+    def results(self):
+        results = self.trainer.results()
+        results['workers'] = self.n_workers
+        return results
+
+
+if __name__ == "__main__":
+    from checkpoint import save_checkpoint
+
+    parser = argparse.ArgumentParser(
+        description="Równoległe uczenie Q ze wspólną tablicą Q")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="liczba procesów (domyślnie liczba rdzeni)")
+    parser.add_argument('--locks', type=int, default=0,
+                        help="liczba blokad pasów wierszy (0 - Hogwild)")
+    parser.add_argument('--episodes', type=int, default=1000,
+                        help="liczba epizodów")
+    parser.add_argument('--dynamics', default=None, help="nazwa zadania")
+    parser.add_argument('-o', '--output', default='Learn_parallel.npz',
+                        help="plik punktu kontrolnego")
+    args = parser.parse_args()
+
+    config = {'label': 'parallel', 'maxEpisodes': args.episodes}
+    if args.dynamics is not None:
+        config['dynamics'] = args.dynamics
+    parallel = ParallelTrainer(config, args.workers, args.locks)
+    results = parallel.run()
+    save_checkpoint(parallel.trainer, args.output)
+    print(f"Epizody: {results['episodes']}, kroki: {results['steps']}, "
+          f"czas: {results['elapsed']:.1f} s, "
+          f"kroki/s: {results['steps'] / results['elapsed']:.0f}, "
+          f"koniec: {results['stop_reason']}")
@@ -0,0 +1,295 @@
+"""
+Planowanie na modelu dla deterministycznych modeli dynamiki.
+
+Dla modelu deterministycznego następnik komórki siatki po jednym kroku
+integratora o długości dt zależy tylko od (komórka, sterowanie). Tablicę
+następników liczy się raz (wsadowo) i zapisuje na dysku, a Q-funkcję
+wyznacza się iteracją wartości lub iteracją strategii. Wynik służy jako
+wzorzec dla uczenia na próbkach.
+
+Uruchomienie (zapis punktu kontrolnego czytelnego dla load_policy i
+porównanie z wynikiem uczenia):
+    python planning.py [--method value|policy] [--config config.json]
+                       [--dynamics nazwa] [--compare Learn_X.npz]
+                       [-o Plan_X.npz]
+"""
+import hashlib
+import inspect
+import os
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+
+from toolbox import get_integrator, normalize_fi_batch
+
+
+def _source(func):
+    """
+    Kod źródłowy funkcji do klucza pamięci podręcznej (zmiana treści
+    modelu unieważnia zapisaną tablicę); gdy źródło jest niedostępne -
+    kod bajtowy funkcji.
+    """
+    try:
+        return inspect.getsource(func).encode()
+    except (OSError, TypeError):
+        code = getattr(func, '__code__', None)
+        return b'' if code is None else code.co_code
+
+
+def _cache_key(dynamics, dt, grid, control, integrator, substeps):
+    h = hashlib.sha1()
+    h.update(f"{dynamics.__module__}.{dynamics.__qualname__}".encode())
+    h.update(_source(dynamics))
+    h.update(repr(float(dt)).encode())
+    h.update(f"{integrator}/{int(substeps)}".encode())
+    h.update(np.ascontiguousarray(grid.x1, dtype=float).tobytes())
+    h.update(np.ascontiguousarray(grid.x2, dtype=float).tobytes())
+    h.update(np.ascontiguousarray(control, dtype=float).tobytes())
+    return h.hexdigest()[:16]
+
+
+def grid_states(grid):
+    """
+    Wszystkie punkty siatki jako tablica (n_states, 2), w kolejności
+    indeksu globalnego n_x2 * i + j.
+    """
+    return np.column_stack([
+        np.repeat(grid.x1, grid.n_x2),
+        np.tile(grid.x2, grid.n_x1),
+    ])
+
+
+def transition_table(dynamics, dt, grid, control, cache_dir='.cache',
+                     integrator='rk4', substeps=1):
+    """
+    Tablica następników T[k_x, k_u] po jednym kroku integratora.
+
+    Parametry:
+        dynamics : callable
+            Deterministyczny model dynamiki
+        dt : float
+            Krok czasowy
+        grid : StateGrid
+            Siatka stanu
+        control : array-like
+            Dyskretne wartości sterowania
+        cache_dir : str lub None
+            Katalog pamięci podręcznej (None - bez zapisu na dysk); klucz
+            obejmuje kod źródłowy modelu, krok, integrator, siatkę i
+            sterowania
+        integrator, substeps : str, int
+            Integrator (patrz toolbox.get_integrator)
+
+    Zwraca:
+        T : ndarray
+            Indeksy następników o kształcie (n_states, m_u)
+    """
+    if getattr(dynamics, 'stochastic', False):
+        raise ValueError(
+            "Transition table requires a deterministic dynamics model.")
+    control = np.asarray(control, dtype=float)
+
+    path = None
+    if cache_dir is not None:
+        key = _cache_key(dynamics, dt, grid, control, integrator, substeps)
+        path = os.path.join(cache_dir, f"transitions_{key}.npy")
+        if os.path.exists(path):
+            T = np.load(path)
+            if T.shape == (grid.n_states, len(control)):
+                return T
+
+    _, step_batch = get_integrator(integrator, substeps)
+    X = grid_states(grid)
+    T = np.empty((grid.n_states, len(control)), dtype=np.intp)
+    for k_u, u in enumerate(control):
+        x = step_batch(dynamics, dt, X, np.full(len(X), u))
+        x[:, 0] = normalize_fi_batch(x[:, 0])
+        T[:, k_u] = grid.index_batch(x)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = path + '.tmp.npy'
+        np.save(tmp, T)
+        os.replace(tmp, path)
+    return T
+
+
+def value_iteration(T, rx, ru, gamma, tol=1e-6, max_iter=10000):
+    """
+    Synchroniczna iteracja wartości
+    Q(k, u) = rx[T(k, u)] + ru[u] + gamma * max Q(T(k, u), .).
+
+    Zwraca:
+        Q : ndarray
+            Q-funkcja (n_states, m_u)
+        n_iter : int
+            Liczba wykonanych iteracji
+        converged : bool
+            Czy osiągnięto tolerancję tol
+    """
+    R = rx[T] + ru[None, :]
+    Q = np.zeros(T.shape)
+    for n_iter in range(1, max_iter + 1):
+        V = np.max(Q, axis=1)
+        Q_new = R + gamma * V[T]
+        change = np.max(np.abs(Q_new - Q))
+        Q = Q_new
+        if change < tol:
+            return Q, n_iter, True
+    return Q, max_iter, False
+
+
+def policy_iteration(T, rx, ru, gamma, max_iter=200):
+    """
+    Iteracja strategii z dokładną oceną strategii (układ rzadki
+    (I - gamma P) V = R). Wymaga gamma < 1.
+
+    Zwraca:
+        Q : ndarray
+            Q-funkcja (n_states, m_u)
+        n_iter : int
+            Liczba wykonanych iteracji
+        converged : bool
+            Czy strategia przestała się zmieniać
+    """
+    if not (gamma < 1):
+        raise ValueError("Policy iteration requires gamma < 1.")
+    n_states = T.shape[0]
+    rows = np.arange(n_states)
+    R = rx[T] + ru[None, :]
+    eye = sparse.identity(n_states, format='csr')
+
+    policy = np.zeros(n_states, dtype=np.intp)
+    for n_iter in range(1, max_iter + 1):
+        P = sparse.csr_matrix(
+            (np.ones(n_states), (rows, T[rows, policy])),
+            shape=(n_states, n_states))
+        V = spsolve((eye - gamma * P).tocsc(), R[rows, policy])
+        Q = R + gamma * V[T]
+
+        # zmiana sterowania tylko przy ścisłej poprawie (brak oscylacji)
+        best = np.argmax(Q, axis=1)
+        improve = Q[rows, best] > Q[rows, policy] + 1e-12 * np.abs(V)
+        if not np.any(improve):
+            return Q, n_iter, True
+        policy = np.where(improve, best, policy)
+    return Q, max_iter, False
+
+
+def solve(trainer, method='value', cache_dir='.cache', **kwargs):
+    """
+    Wyznacza Q-funkcję dla konfiguracji trenera (dynamika, siatka,
+    sterowanie, nagroda, gamma, dt, integrator) metodą planowania i
+    zapisuje wynik w trenerze (Q, V, U).
+
+    Parametry:
+        trainer : QLearnTrainer
+            Trener z konfiguracją zadania
+        method : str
+            'value' (iteracja wartości) lub 'policy' (iteracja strategii)
+        cache_dir : str lub None
+            Katalog pamięci podręcznej tablicy następników
+        **kwargs
+            Parametry przekazywane do value_iteration / policy_iteration
+
+    Zwraca:
+        dict: wyniki jak QLearnTrainer.results() oraz 'iterations',
+        'converged' i 'method'
+    """
+    solvers = {'value': value_iteration, 'policy': policy_iteration}
+    if method not in solvers:
+        raise ValueError(f"method must be one of {list(solvers)}.")
+
+    start_time = time.time()
+    T = transition_table(trainer.dynamics, trainer.dt, trainer.grid,
+                         trainer.control, cache_dir=cache_dir,
+                         integrator=trainer.integrator,
+                         substeps=trainer.substeps)
+    Q, n_iter, converged = solvers[method](
+        T, trainer.rx, trainer.ru, trainer.gamma, **kwargs)
+
+    trainer.Q[...] = Q
+    trainer.update_statistics(full=True)
+    trainer.elapsed = time.time() - start_time
+
+    results = trainer.results()
+    results.update({
+        'iterations': n_iter,
+        'converged': converged,
+        'method': method,
+    })
+    return results
+
+
+def compare(trainer, path):
+    """
+    Porównanie Q-funkcji z planowania (trener po solve) z punktem
+    kontrolnym uczenia na tej samej siatce i zbiorze sterowań.
+
+    Zwraca:
+        dict: 'V_error' (średni błąd bezwzględny V), 'V_error_max' i
+        'policy_agreement' (udział komórek z tym samym sterowaniem)
+    """
+    from checkpoint import load_checkpoint
+
+    arrays, _ = load_checkpoint(path)
+    if not (np.array_equal(arrays['x1'], trainer.x1)
+            and np.array_equal(arrays['x2'], trainer.x2)
+            and np.array_equal(arrays['control'], trainer.control)):
+        raise ValueError(
+            "Checkpoint grid or control set differs from the planner's.")
+    Q = arrays['Q'].astype(float)
+    V_error = np.abs(Q.max(axis=1) - trainer.V)
+    return {
+        'V_error': float(np.mean(V_error)),
+        'V_error_max': float(np.max(V_error)),
+        'policy_agreement': float(np.mean(
+            np.argmax(Q, axis=1) == np.argmax(trainer.Q, axis=1))),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from checkpoint import save_checkpoint
+    from trainer import make_trainer
+
+    parser = argparse.ArgumentParser(
+        description="Q-funkcja z planowania na tablicy następników")
+    parser.add_argument('--method', choices=['value', 'policy'],
+                        default='value', help="iteracja wartości/strategii")
+    parser.add_argument('--config', default=None,
+                        help="plik JSON z konfiguracją (klucze jak "
+                             "trainer.DEFAULT_CONFIG, np. config.json "
+                             "z sweep.py)")
+    parser.add_argument('--dynamics', default=None, help="nazwa zadania")
+    parser.add_argument('--compare', default=None,
+                        help="punkt kontrolny uczenia do porównania")
+    parser.add_argument('-o', '--output', default=None,
+                        help="plik punktu kontrolnego "
+                             "(domyślnie Plan_<etykieta>.npz)")
+    args = parser.parse_args()
+
+    config = {'label': 'plan'}
+    if args.config is not None:
+        with open(args.config, encoding='utf-8') as f:
+            config = json.load(f)
+    if args.dynamics is not None:
+        config['dynamics'] = args.dynamics
+    trainer = make_trainer(config)
+    results = solve(trainer, args.method)
+    output = args.output or f"Plan_{trainer.config['label']}.npz"
+    save_checkpoint(trainer, output)
+    print(f"Zapisano {output}: iteracje {results['iterations']}, "
+          f"zbieżność: {results['converged']}, "
+          f"czas: {results['elapsed']:.1f} s, "
+          f"Vmean: {np.mean(trainer.V):.4f}")
+    if args.compare is not None:
+        diff = compare(trainer, args.compare)
+        print(f"Porównanie z {args.compare}: "
+              f"średni |ΔV| {diff['V_error']:.4f}, "
+              f"max |ΔV| {diff['V_error_max']:.4f}, "
+              f"zgodność strategii {100 * diff['policy_agreement']:.1f}%")
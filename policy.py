@@ -0,0 +1,136 @@
+"""
+Strategia sterowania na siatce stanu.
+
+Policy łączy siatkę stanu (StateGrid), zbiór sterowań (control), indeksy
+sterowań zachłannych dla komórek siatki i - jeżeli jest dostępna -
+tablicę Q. Zapytania dla pojedynczego stanu (control, action_index,
+value) kosztują O(1), a ich wersje *_batch obsługują tablice stanów
+(N, 2) w całości operacjami numpy. Przy interpolate=True wartości Q
+interpolowane są dwuliniowo między czterema sąsiednimi punktami siatki,
+co daje gładsze sterowanie niż sterowanie najbliższej komórki.
+"""
+import numpy as np
+
+from toolbox import StateGrid
+
+
+class Policy:
+    """
+    Strategia zachłanna względem Q na siatce stanu.
+
+    Parametry:
+        x1, x2 : array-like
+            Siatka stanu
+        control : array-like
+            Zbiór sterowań
+        U : array-like lub None
+            Sterowanie dla komórek siatki (None - z Q)
+        Q : ndarray lub None
+            Tablica Q (n_states, len(control)); wymagana dla value(),
+            q_values() i interpolacji
+        interpolate : bool
+            Dwuliniowa interpolacja Q w control(), action_index() i value()
+    """
+
+    def __init__(self, x1, x2, control, U=None, Q=None, interpolate=False):
+        self.grid = StateGrid(x1, x2)
+        self.control_set = np.asarray(control, dtype=float)
+        if Q is None and U is None:
+            raise ValueError("Policy requires U or Q.")
+        if Q is None and interpolate:
+            raise ValueError("Interpolated policy requires Q.")
+        self.Q = Q
+        if Q is not None:
+            self.actions = np.argmax(Q, axis=1)
+        else:
+            # indeks najbliższego sterowania ze zbioru
+            U = np.asarray(U, dtype=float)
+            self.actions = np.argmin(
+                np.abs(U[:, None] - self.control_set[None, :]), axis=1)
+        self.U = (self.control_set[self.actions] if U is None
+                  else np.asarray(U, dtype=float))
+        self.V = None if Q is None else Q.max(axis=1).astype(float)
+        self.interpolate = interpolate
+        self._U = self.U.tolist()  # wartości float dla ścieżki skalarnej
+
+    @classmethod
+    def from_trainer(cls, trainer, interpolate=False):
+        return cls(trainer.x1, trainer.x2, trainer.control, trainer.U,
+                   trainer.Q, interpolate)
+
+    @classmethod
+    def from_policy(cls, policy, interpolate=False):
+        """Strategia ze słownika checkpoint.load_policy."""
+        return cls(policy['x1'], policy['x2'], policy['control'],
+                   policy['U'], policy.get('Q'), interpolate)
+
+    def cell(self, x):
+        """Indeks komórki siatki najbliższej stanowi x."""
+        return self.grid.index(x)
+
+    def cell_batch(self, X):
+        return self.grid.index_batch(X)
+
+    def q_values(self, x):
+        """Wiersz Q w stanie x (interpolowany przy interpolate=True)."""
+        if not self.interpolate:
+            return self.Q[self.grid.index(x)]
+        i, w1 = self.grid.axis1.bracket(x[0])
+        j, w2 = self.grid.axis2.bracket(x[1])
+        k = self.grid.n_x2 * i + j
+        Q, n_x2 = self.Q, self.grid.n_x2
+        return ((1 - w1) * ((1 - w2) * Q[k] + w2 * Q[k + 1])
+                + w1 * ((1 - w2) * Q[k + n_x2] + w2 * Q[k + n_x2 + 1]))
+
+    def q_values_batch(self, X):
+        """Wiersze Q (N, len(control)) dla stanów X (N, 2)."""
+        X = np.asarray(X, dtype=float)
+        if not self.interpolate:
+            return self.Q[self.grid.index_batch(X)]
+        i, w1 = self.grid.axis1.bracket_batch(X[:, 0])
+        j, w2 = self.grid.axis2.bracket_batch(X[:, 1])
+        k = self.grid.n_x2 * i + j
+        Q, n_x2 = self.Q, self.grid.n_x2
+        w1, w2 = w1[:, None], w2[:, None]
+        return ((1 - w1) * ((1 - w2) * Q[k] + w2 * Q[k + 1])
+                + w1 * ((1 - w2) * Q[k + n_x2] + w2 * Q[k + n_x2 + 1]))
+
+    def action_index(self, x):
+        """Indeks sterowania zachłannego w stanie x."""
+        if self.interpolate:
+            return int(np.argmax(self.q_values(x)))
+        return self.actions[self.grid.index(x)]
+
+    def action_index_batch(self, X):
+        if self.interpolate:
+            return np.argmax(self.q_values_batch(X), axis=1)
+        return self.actions[self.grid.index_batch(X)]
+
+    def control(self, x):
+        """Sterowanie zachłanne w stanie x."""
+        if self.interpolate:
+            return self.control_set[self.action_index(x)]
+        return self._U[self.grid.index(x)]
+
+    def control_batch(self, X):
+        if self.interpolate:
+            return self.control_set[self.action_index_batch(X)]
+        return self.U[self.grid.index_batch(X)]
+
+    def value(self, x):
+        """Wartość V(x) = max_u Q(x, u)."""
+        if self.interpolate:
+            return float(np.max(self.q_values(x)))
+        return self.V[self.grid.index(x)]
+
+    def value_batch(self, X):
+        if self.interpolate:
+            return np.max(self.q_values_batch(X), axis=1)
+        return self.V[self.grid.index_batch(X)]
+
+    def map(self, values=None):
+        """
+        Wartości komórek (domyślnie U) jako macierz (n_x2, n_x1) do
+        wykresów contourf(x1, x2, ...) i pcolormesh(x1, x2, ...).
+        """
+        return self.grid.map(self.U if values is None else values)
@@ -0,0 +1,80 @@
+"""
+Pomiar czasu poszczególnych faz pętli uczenia.
+
+Trener z włączonym profilowaniem (QLearnTrainer(..., profile=True))
+sumuje czas i liczbę wywołań dla faz:
+
+    index       - wyznaczanie indeksu stanu
+    action      - wybór sterowania (epsilon-zachłanny)
+    integration - całkowanie równań ruchu
+    update      - aktualizacja Q
+    planning    - aktualizacje Dyna-Q z pamięci przejść
+    policy      - aktualizacja V i U
+    statistics  - statystyki epizodu (Vmean, Qmean)
+    checkpoint  - zapis punktów kontrolnych (obserwator)
+    plotting    - rysowanie (obserwator)
+    observers   - pozostali obserwatorzy
+
+Obserwator przypisuje się do fazy atrybutem `profile_phase`.
+"""
+import time
+
+PHASES = ('index', 'action', 'integration', 'update', 'planning', 'policy',
+          'statistics', 'checkpoint', 'plotting', 'observers')
+
+
+class PhaseProfiler:
+    """Akumulator czasu i liczby wywołań dla faz uczenia."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+
+    def lap(self, phase, t0):
+        """
+        Dolicza czas od t0 do fazy `phase`.
+
+        Zwraca:
+            float: bieżący czas (początek kolejnej fazy)
+        """
+        t = time.perf_counter()
+        self.times[phase] = self.times.get(phase, 0.0) + t - t0
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+        return t
+
+    def report(self):
+        """
+        Zwraca:
+            dict: {faza: {'time': s, 'calls': n, 'share': udział}} oraz
+            'total' - łączny zmierzony czas [s]
+        """
+        total = sum(self.times.values())
+        phases = {
+            phase: {
+                'time': self.times[phase],
+                'calls': self.counts[phase],
+                'share': self.times[phase] / total if total > 0 else 0.0,
+            }
+            for phase in self.times
+        }
+        return {'phases': phases, 'total': total}
+
+    def format(self, compact=False):
+        """
+        Raport tekstowy (np. do panelu informacyjnego); compact=True
+        pomija czasy i podaje tylko udziały faz.
+        """
+        report = self.report()
+        lines = []
+        for phase, row in report['phases'].items():
+            if not row['calls']:
+                continue
+            if compact:
+                lines.append(f"{phase:12s}{100 * row['share']:5.1f}%")
+            else:
+                lines.append(f"{phase:12s}{row['time']:9.2f} s "
+                             f"{100 * row['share']:5.1f}%")
+        return "\n".join(lines)
@@ -1,19 +1,17 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import pickle
 from matplotlib.widgets import Button
-from scipy.linalg import solve_continuous_are as care
 
 import sys
 import os
+import time
 
-from toolbox import (
-    state_global_index,
-    normalize_fi,
-    rk_4,
-    aw_matrices_AB,
-)
-from interface import enter_interface_simulation
+from toolbox import get_integrator, set_state_ticks
+from checkpoint import load_policy
+from interface import enter_interface_simulation, optional
+from lqr import controller_for_policy, gain_table_path
+from policy import Policy
+from trajectory import SimulationCore, TrajectoryRecorder
 
 # Globalne flagi
 Stop = False
@@ -41,12 +39,148 @@ def pause_callback(event):
     pause_button.ax.figure.canvas.draw_idle()
 
 
+class PathBuffer:
+    """
+    Bufor cykliczny ostatnich `capacity` punktów ścieżki na mapie (stała
+    pamięć niezależnie od długości symulacji).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.points = np.zeros((capacity, 2))
+        self.pos = 0
+        self.n = 0
+
+    def append(self, px, py):
+        self.points[self.pos] = px, py
+        self.pos = (self.pos + 1) % self.capacity
+        self.n = min(self.n + 1, self.capacity)
+
+    def offsets(self):
+        """Punkty od najstarszego do najnowszego, kształt (n, 2)."""
+        if self.n < self.capacity:
+            return self.points[:self.n]
+        return np.roll(self.points, -self.pos, axis=0)
+
+
+class BlitRenderer:
+    """
+    Odświeżanie animowanych artystów przez blitting: tło (osie, mapa,
+    przyciski) rysowane jest raz i zapamiętywane, a w każdej klatce
+    rysowani są tylko artyści animowani. Po każdym pełnym rysowaniu
+    (zmiana rozmiaru okna, kliknięcie przycisku) tło jest zapamiętywane
+    ponownie. Gdy płótno nie obsługuje blittingu, rysowana jest cała
+    figura.
+    """
+
+    def __init__(self, fig, artists):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.artists = list(artists)
+        self.background = None
+        for artist in self.artists:
+            artist.set_animated(True)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def update(self):
+        """Narysowanie bieżącej klatki."""
+        if self.background is None or not self.canvas.supports_blit:
+            self.canvas.draw_idle()
+        else:
+            self.canvas.restore_region(self.background)
+            self._draw_artists()
+            self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+
+    def pause(self, interval):
+        """Obsługa zdarzeń okna (przyciski) przez `interval` sekund."""
+        if interval > 0:
+            self.canvas.start_event_loop(interval)
+        else:
+            self.canvas.flush_events()
+
+
+class FramePacer:
+    """
+    Liczba kroków symulacji na klatkę przy zadanej liczbie klatek na
+    sekundę (fps) i współczynniku czasu rzeczywistego (rtf): w czasie t
+    zegara wykonywanych jest t * rtf / dt kroków. Gdy rysowanie nie
+    nadąża, klatki są pomijane (więcej kroków na klatkę, najwyżej
+    max_steps). W trybie szybkim (fast) kroki wykonywane są przez cały
+    czas klatki, bez oczekiwania.
+    """
+
+    def __init__(self, dt, fps=30.0, rtf=1.0, fast=False, max_steps=10000):
+        if not (fps > 0):
+            raise ValueError("fps must be positive.")
+        if not (rtf > 0):
+            raise ValueError("Real-time factor must be positive.")
+        self.dt = dt
+        self.frame_time = 1.0 / fps
+        self.rtf = rtf
+        self.fast = fast
+        self.max_steps = max_steps
+        self.reset()
+
+    def reset(self):
+        """Początek odmierzania czasu (start lub koniec pauzy)."""
+        self.frame_start = time.perf_counter()
+        self.debt = 0.0  # zaległe (ułamkowe) kroki symulacji
+
+    def run(self, sim, limit):
+        """
+        Kroki symulacji należne w bieżącej klatce (najwyżej `limit`).
+
+        Zwraca:
+            int: liczba wykonanych kroków
+        """
+        start = self.frame_start
+        now = time.perf_counter()
+        self.frame_start = now
+        if self.fast:
+            # partie kroków aż do wyczerpania czasu klatki
+            deadline = now + self.frame_time
+            done = 0
+            batch = 16
+            while done < limit and time.perf_counter() < deadline:
+                n = min(batch, limit - done)
+                sim.advance(n)
+                done += n
+                batch = min(2 * batch, self.max_steps)
+            return done
+        self.debt += (now - start) * self.rtf / self.dt
+        n = int(self.debt)
+        self.debt -= n
+        if n > self.max_steps:
+            # symulacja nie nadąża - pominięcie zaległych kroków
+            n, self.debt = self.max_steps, 0.0
+        n = min(n, limit)
+        sim.advance(n)
+        return n
+
+    def wait(self, renderer):
+        """Obsługa zdarzeń okna do początku następnej klatki."""
+        if self.fast:
+            renderer.pause(0)
+        else:
+            renderer.pause(self.frame_start + self.frame_time
+                           - time.perf_counter())
+
+
 def air_simul(path_to_file=None, parent=None):
     """
     Funkcja do symulacji wahadła lub huśtawki na podstawie danych z pliku.
     Parametry:
-        path_to_file (str): Ścieżka do pliku z danymi. Jeśli None, użyje
-        domyślnego pliku 'Learn_TEST.pkl'.
+        path_to_file (str): Ścieżka do pliku z danymi (.npz lub .pkl).
+        Jeśli None, użyje domyślnego pliku 'Learn_TEST.pkl'.
         parent (tk.Tk): Rodzic okna, jeśli jest używane w aplikacji GUI.
     Zwraca:
         None
@@ -71,33 +205,56 @@ def air_simul(path_to_file=None, parent=None):
     fi_0 = float(answers[1]) * np.pi / 180.0
     om_0 = float(answers[2])
     dt1 = float(answers[3])
-    dt_delay = float(answers[4])
+    fps = float(answers[4])
     maxit = int(answers[5])
     trace = bool(answers[6])
+    lqr_angle = optional(answers[7], float, np.inf) * np.pi / 180.0
+    lqr_rate = optional(answers[8], float, np.inf)
+    rtf = float(answers[9])
+    fast = bool(answers[10])
+    record = bool(answers[11])
+    interpolate = bool(answers[12])
+    N_trace = int(answers[13])  # liczba punktów pełnego śladu
+    if N_trace < 1:
+        raise ValueError("Trace length must be a positive integer.")
 
     # --- Wczytaj dane z pliku ---
-    with open(path_to_file, 'rb') as f:
-        data = pickle.load(f)
+    data = load_policy(path_to_file)
     StudInd = data['StudInd']
     DynName = data['DynName']
     DynamicsAct = data['DynamicsAct']
-    U = data['U']
     dt = data['dt']
-    u_max = data['u_max']
     x1 = data['x1']
     x2 = data['x2']
     control = data['control']
 
+    lqr = None
+    if controlLQR:
+        # obszar przełączenia Q -> LQR (bez ograniczeń: LQR wszędzie)
+        switch = (None if np.isinf(lqr_angle) and np.isinf(lqr_rate)
+                  else (lqr_angle, lqr_rate))
+        lqr = controller_for_policy(data, switch=switch)
+        # tablica wzmocnień z `python lqr.py <plik>`, jeżeli pasuje do
+        # strategii; w przeciwnym razie wzmocnienia wyznaczane na bieżąco
+        table_path = gain_table_path(path_to_file)
+        if os.path.exists(table_path) and not lqr.load_table(table_path):
+            print(f"Tablica {table_path} nie pasuje do strategii.")
+
     dt = dt1
-    n1 = len(x1)
-    n2 = len(x2)
+    # integrator użyty podczas uczenia (dawne pliki: rk4)
+    step, _ = get_integrator(data.get('integrator', 'rk4'),
+                             data.get('substeps', 1))
+    if interpolate and data.get('Q') is None:
+        print("Plik nie zawiera tablicy Q - sterowanie bez interpolacji.")
+        interpolate = False
+    policy = Policy.from_policy(data, interpolate)
 
     SwingProblem = 0
     if DynName == 'Huśtawka':
         SwingProblem = 1
 
     x_InitCond = [fi_0, om_0]
-    U_2 = U.reshape((n1, n2)).T
+    U_2 = policy.map()
 
     # --- Ustaw wykres ---
     fig = plt.figure(figsize=(8, 5))
@@ -124,22 +281,27 @@ def air_simul(path_to_file=None, parent=None):
     # cmap = plt.get_cmap('jet', 10)
     cmap = plt.get_cmap('jet', len(control))
     ax_map.set_prop_cycle(color=cmap(np.linspace(0, 1, len(control))))
-    map_img = ax_map.imshow(U_2*0 if controlLQR else U_2,
-                            aspect='auto', cmap=cmap, origin='lower')
+    # mapa we współrzędnych fizycznych (także dla siatki niejednorodnej)
+    map_img = ax_map.pcolormesh(x1, x2, U_2*0 if controlLQR else U_2,
+                                cmap=cmap, shading='nearest')
     plt.colorbar(map_img, ax=ax_map)
     ax_map.set_title(
         'Sterowanie u(θ, dθ/dt)' if not controlLQR else 'Sterowanie LQR')
-    ax_map.set_xticks([0, n1//2, n1-1])
-    ax_map.set_xticklabels(['-π', '0', 'π'])
-    ax_map.set_yticks([0, n2//2, n2-1])
-    ax_map.set_yticklabels(['-π', '0', 'π'])
+    set_state_ticks(ax_map, x2)
     ax_map.set_xlabel('θ (rad)')
     ax_map.set_ylabel('dθ/dt (rad/s)')
-    ax_map.set_xlim(0, n1-1)
-    ax_map.set_ylim(0, n2-1)
-    pathmap, = ax_map.plot([], [], '.w', markersize=10)
-    pathx = []
-    pathy = []
+    ax_map.set_xlim(x1[0], x1[-1])
+    ax_map.set_ylim(x2[0], x2[-1])
+    # ślad na mapie: jeden obiekt scatter, przezroczystość punktów
+    # zmieniana w tablicy kolorów; ograniczona liczba zapamiętanych punktów
+    # (trwały ślad: N_trace ostatnich punktów z dialogu, starsze znikają)
+    N_fade = 50  # liczba punktów śladu z efektem blaknięcia
+    path = PathBuffer(N_trace if trace else N_fade)
+    # alfa od najstarszego do najnowszego punktu: 0 ... (N-1)/N
+    path_colors = np.ones((N_fade, 4))  # biały, alfa w kolumnie 3
+    path_colors[:, 3] = np.arange(N_fade) / N_fade
+    pathmap = ax_map.scatter(np.empty(0), np.empty(0), s=100, marker='.',
+                             color='w', linewidths=0)
 
     # Przyciski
     stop_ax = plt.axes([0.7, 0.025, 0.07, 0.04])
@@ -155,41 +317,40 @@ def air_simul(path_to_file=None, parent=None):
     _ = ax_map.text(-0.1, -0.15, DynName, fontsize=10, fontweight='bold',
                     ha='left', va='top', transform=ax_map.transAxes)
 
-    x = np.array(x_InitCond, dtype=float)
-    t = 0.0
-
-    for timestep in range(maxit):
-        plt.pause(dt_delay)
-
-        k_x = state_global_index(x, x1, x2, n2)
-        u = U[int(k_x)]
-
-        # LQR (opcjonalnie)
-        if controlLQR:
-            # Algorytm LQR - rozwiązanie równań Riccatiego
-            # A, B, QQ, RR to macierze systemu
-            A, B = aw_matrices_AB(DynamicsAct, x, t, u, 2, 1)
-            RR = np.array([[1.0]])  # Macierz wag dla sterowania
-            QQ = np.array([[1.0, 0.0], [0.0, 1.0]])  # Macierz wag dla stanu
-            # Rozwiązanie równania Riccatiego:
-            # A^T P + P A - P B R⁻¹ B^T P + Q = 0
-            # Algorytm CARE (Continuous-time Algebraic Riccati Equation)
-            P = care(A, B, QQ, RR)
-            # Wyliczenie wzmocnienia sprzężenia zwrotnego: K = R⁻¹ B^T P
-            K = np.linalg.inv(RR) @ B.T @ P
-            u = -K @ x.T  # Sterowanie LQR
-            u = np.clip(u[0], -u_max, u_max)
-        else:
-            # Normalne sterowanie z Q-funkcji
-            u = U[int(k_x)]
-
+    renderer = BlitRenderer(fig, [f, f1, f2, txt, pathmap])
+    plt.show(block=False)
+    plt.pause(0.001)
+
+    # zapis trajektorii do Traj_<etykieta>/ (trajectory.py replay)
+    recorder = None
+    if record:
+        recorder = TrajectoryRecorder(f"Traj_{StudInd}", meta={
+            'label': StudInd, 'dynamics': DynName, 'dt': dt,
+            'integrator': data.get('integrator', 'rk4'),
+            'substeps': data.get('substeps', 1), 'x0': x_InitCond,
+            'interpolate': interpolate})
+    sim = SimulationCore(DynamicsAct, step, policy, dt, x_InitCond,
+                         lqr=lqr, path=path, recorder=recorder)
+    # fizyka ze stałym krokiem dt, rysowanie z częstotliwością fps
+    pacer = FramePacer(dt, fps=fps, rtf=rtf, fast=fast)
+    paused = True
+    wall_start = time.perf_counter()
+    wall_time = 0.0  # czas zegara bez pauz [s]
+
+    while sim.steps < maxit:
+        if Pause != paused:
+            # po pauzie odliczanie od nowa, bez zaległych kroków
+            paused = Pause
+            pacer.reset()
+            if not paused:
+                wall_start = time.perf_counter() - wall_time
+        if not paused:
+            pacer.run(sim, maxit - sim.steps)
+            wall_time = time.perf_counter() - wall_start
+
+        x, u = sim.x, sim.u
         PendLen = PendLen0 + 0.5 * u * SwingProblem
 
-        # Aktualizacja stanu
-        if not Pause:
-            x = rk_4(DynamicsAct, dt, x, u)
-            x[0] = normalize_fi(x[0])
-
         # Rysowanie wahadła
         se = np.sin(x[0])
         ce = np.cos(x[0])
@@ -204,44 +365,34 @@ def air_simul(path_to_file=None, parent=None):
                     [PendLen * ce, PendLen * ce])
 
         # Aktualizacja ścieżki na mapie
-        k1_x = state_global_index(x, x1, x2, n2)
-        newx, newy = np.unravel_index(indices=int(k1_x), shape=(n1, n2))
-        pathx.append(newx)
-        pathy.append(newy)
-
-        if trace:
-            # Rysowanie śladu na mapie
-            pathmap.set_data(pathx, pathy)
-        else:
-            # Aktualizacja ścieżki na mapie z efektem blaknięcia
-            N_fade = 50  # liczba punktów śladu, które mają być widoczne
-            for coll in getattr(ax_map, '_fade_dots', []):
-                coll.remove()
-            ax_map._fade_dots = []
-            n_points = len(pathx)
-            for i in range(max(0, n_points - N_fade), n_points):
-                alpha = (i - (n_points - N_fade)) / N_fade  # od 0 do 1
-                dot = ax_map.plot(pathx[i], pathy[i],
-                                  '.w', markersize=10, alpha=alpha)[0]
-                ax_map._fade_dots.append(dot)
-
-        # Aktualizacja tekstu
+        pathmap.set_offsets(path.offsets())
+        if not trace:
+            # najnowszy punkt zawsze z największą alfą (efekt blaknięcia)
+            pathmap.set_facecolor(path_colors[N_fade - path.n:])
+
+        # Aktualizacja tekstu (rtf - osiągnięty współczynnik czasu)
+        rtf_actual = sim.t / wall_time if wall_time > 0 else 0.0
         txt.set_text(
             f'θ = {x[0]*180.0/np.pi:8.4f} [deg]\n'
             f'dθ/dt = {x[1]:8.4f} [rad/s]\n'
             f'u = {u:8.4f} [N]\n'
-            f't = {t:8.4f} [s]'
+            f't = {sim.t:8.4f} [s]\n'
+            f'rtf = {rtf_actual:8.2f}'
         )
 
-        # Aktualizacja czasu
-        if not Pause:
-            t += dt
+        renderer.update()
 
         if Stop:
             plt.savefig(f"Simul_{StudInd}.png")
             plt.pause(1)
             break
+        if not plt.fignum_exists(fig.number):
+            break  # okno zamknięte
+
+        pacer.wait(renderer)
 
+    if recorder is not None:
+        recorder.close()
     plt.close(fig)
 
 
@@ -0,0 +1,213 @@
+"""
+Przegląd hiperparametrów: wiele przebiegów uczenia bez interfejsu
+graficznego, uruchamianych równolegle w puli procesów.
+
+Plik konfiguracyjny (JSON) zawiera konfigurację bazową i siatkę wartości
+(iloczyn kartezjański) albo jawną listę przebiegów, np.:
+
+    {
+        "base": {"dynamics": "Wahadło proste", "maxEpisodes": 2000},
+        "grid": {"alpha": [0.5, 0.99], "gamma": [0.9, 0.99]}
+    }
+
+    {"runs": [{"label": "a", "alpha": 0.5}, {"label": "b", "alpha": 0.9}]}
+
+Klucze konfiguracji jak trainer.DEFAULT_CONFIG. Każdy przebieg zapisuje
+punkt kontrolny Learn_<label>.npz i config.json we własnym katalogu
+<outdir>/<label>/, a w <outdir>/summary.csv
+powstaje tabela końcowych metryk i czasów.
+
+Uruchomienie:
+    python sweep.py sweep.json [-o katalog] [-j liczba_procesów]
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import traceback
+
+from trainer import make_trainer
+from checkpoint import save_checkpoint
+
+SUMMARY_FIELDS = [
+    'label', 'dynamics', 'control', 'u_max', 'alpha', 'gamma', 'epsil',
+    'epsilDecay', 'dt', 'Qx1', 'Qx2', 'Ru1', 'maxit', 'maxEpisodes', 'dx1',
+    'dx2', 'q_dtype', 'integrator', 'substeps', 'planning_steps', 'method',
+    'lam',
+    'episodes', 'steps', 'updates', 'Vmean', 'dVmean', 'Qmean', 'dQmean',
+    'stop_reason', 'elapsed', 'status',
+]
+
+
+def _run_label(base, n):
+    """
+    Etykieta n-tego przebiegu bez własnej etykiety: <label bazowy>_000,
+    _001, ... albo run_000, run_001, ..., gdy `base` nie ma etykiety.
+    """
+    return f"{base.get('label', 'run')}_{n:03d}"
+
+
+def expand_grid(base=None, grid=None):
+    """
+    Lista konfiguracji: iloczyn kartezjański wartości z `grid` nałożony
+    na konfigurację `base`. Przebiegi bez etykiety otrzymują etykietę
+    z numerem przebiegu (patrz _run_label).
+    """
+    base = dict(base or {})
+    grid = grid or {}
+    keys = list(grid)
+    configs = []
+    for n, values in enumerate(itertools.product(*(grid[k] for k in keys))):
+        config = dict(base)
+        config.update(zip(keys, values))
+        if 'label' not in grid:
+            config['label'] = _run_label(base, n)
+        configs.append(config)
+    return configs
+
+
+def load_sweep(path):
+    """
+    Wczytanie listy konfiguracji z pliku JSON. Etykieta z `base` nie jest
+    kopiowana do przebiegów, tylko służy jako przedrostek etykiet
+    przebiegów bez własnej etykiety.
+    """
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+    if 'runs' in spec:
+        base = spec.get('base', {})
+        configs = []
+        for n, run in enumerate(spec['runs']):
+            config = dict(base)
+            config['label'] = _run_label(base, n)
+            config.update(run)
+            configs.append(config)
+        return configs
+    return expand_grid(spec.get('base'), spec.get('grid'))
+
+
+def run_config(config, outdir):
+    """
+    Jeden przebieg uczenia w katalogu <outdir>/<label>/.
+
+    Zwraca:
+        dict: wiersz tabeli podsumowania
+    """
+    config = dict(config)
+    label = str(config.get('label', 'Run 0'))
+    rundir = os.path.join(outdir, label)
+    os.makedirs(rundir, exist_ok=True)
+    row = {k: config[k] for k in SUMMARY_FIELDS if k in config}
+    row.update({'label': label, 'status': 'ok'})
+    start_time = time.time()
+    try:
+        trainer = make_trainer(config)
+        row.update({k: trainer.config[k] for k in SUMMARY_FIELDS
+                    if k in trainer.config})
+        results = trainer.run()
+
+        save_checkpoint(trainer, os.path.join(rundir, f"Learn_{label}.npz"))
+        with open(os.path.join(rundir, 'config.json'), 'w',
+                  encoding='utf-8') as f:
+            json.dump(trainer.config, f, ensure_ascii=False, indent=2)
+
+        def last(values):
+            return float(values[-1]) if len(values) else float('nan')
+
+        row.update({
+            'episodes': results['episodes'],
+            'steps': results['steps'],
+            'updates': results['updates'],
+            'Vmean': last(results['Vmean']),
+            'dVmean': last(results['dVmean']),
+            'Qmean': last(results['Qmean']),
+            'dQmean': last(results['dQmean']),
+            'stop_reason': results['stop_reason'],
+        })
+    except Exception:
+        row['status'] = 'error'
+        with open(os.path.join(rundir, "qlearn_error.log"), "a",
+                  encoding="utf-8") as f:
+            f.write("=== Nowy błąd podczas uczenia ===\n")
+            f.write(traceback.format_exc())
+            f.write("\n")
+    row['elapsed'] = time.time() - start_time
+    return row
+
+
+def _run_config_star(args):
+    return run_config(*args)
+
+
+def run_sweep(configs, outdir='sweep', processes=None):
+    """
+    Uruchamia przebiegi w puli procesów (domyślnie tylu, ile rdzeni) i
+    zapisuje <outdir>/summary.csv.
+
+    Zwraca:
+        list: wiersze podsumowania w kolejności konfiguracji
+    """
+    labels = [str(c.get('label', 'Run 0')) for c in configs]
+    if len(set(labels)) != len(labels):
+        raise ValueError("Sweep run labels must be unique.")
+    os.makedirs(outdir, exist_ok=True)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(configs)))
+
+    jobs = [(config, outdir) for config in configs]
+    rows = {}
+    with multiprocessing.Pool(processes) as pool:
+        for row in pool.imap_unordered(_run_config_star, jobs):
+            rows[row['label']] = row
+            print(f"[{len(rows)}/{len(jobs)}] {row['label']}: "
+                  f"{row['status']} ({row['elapsed']:.1f} s)")
+    rows = [rows[label] for label in labels]
+
+    with open(os.path.join(outdir, 'summary.csv'), 'w', newline='',
+              encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    return rows
+
+
+def sweep_worker(path, workdir):
+    """Przegląd uruchamiany z aplikacji (osobny proces)."""
+    try:
+        os.chdir(workdir)
+        run_sweep(load_sweep(path),
+                  outdir=os.path.splitext(os.path.basename(path))[0])
+    except Exception:
+        with open("sweep_error.log", "a", encoding="utf-8") as f:
+            f.write("=== Nowy błąd podczas przeglądu ===\n")
+            f.write(traceback.format_exc())
+            f.write("\n")
+
+
+def print_summary(rows):
+    print(f"{'label':16s} {'episodes':>8s} {'Vmean':>12s} {'dVmean':>11s} "
+          f"{'czas [s]':>9s} status")
+    for row in rows:
+        print(f"{row['label']:16s} {row.get('episodes', 0):8d} "
+              f"{row.get('Vmean', float('nan')):12.4f} "
+              f"{row.get('dVmean', float('nan')):11.3E} "
+              f"{row['elapsed']:9.1f} {row['status']}")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(
+        description="Przegląd hiperparametrów Q-learningu")
+    parser.add_argument('config', help="plik JSON z konfiguracjami")
+    parser.add_argument('-o', '--outdir', default='sweep',
+                        help="katalog wyników")
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help="liczba procesów (domyślnie liczba rdzeni)")
+    args = parser.parse_args()
+    print_summary(run_sweep(load_sweep(args.config), args.outdir,
+                            args.processes))
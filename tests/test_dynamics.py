@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from trainer import tasks
+
+MODELS = list(tasks.items())
+
+
+def _states():
+    # punkty po obu stronach i na granicach przedziałów modeli
+    theta = np.array([-3.0, -0.7, -0.5, 0.0, 0.3, 0.7, 0.71, 2.5])
+    theta_dot = np.array([-1.0, 0.0, 0.4, -0.2, 0.0, 1.5, -2.0, 0.1])
+    u = np.array([-1.0, 0.5, 0.0, 1.0, -0.5, 0.25, 0.0, -0.75])
+    return np.column_stack([theta, theta_dot]), u
+
+
+@pytest.mark.parametrize('name, dynamics', MODELS)
+def test_batched_matches_single_state(name, dynamics):
+    X, U = _states()
+    np.random.seed(0)
+    batched = dynamics(X, U)
+    np.random.seed(0)
+    single = np.array([dynamics(x, u) for x, u in zip(X, U)])
+    assert batched.shape == X.shape
+    assert np.array_equal(batched, single)
+
+
+@pytest.mark.parametrize('name, dynamics', MODELS)
+def test_scalar_matches_array(name, dynamics):
+    X, U = _states()
+    for x, u in zip(X, U):
+        np.random.seed(0)
+        expected = dynamics(x, u)
+        np.random.seed(0)
+        scalar = dynamics.scalar(float(x[0]), float(x[1]), float(u))
+        assert np.array_equal(np.array(scalar), expected)
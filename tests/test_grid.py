@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from toolbox import (
+    StateGrid,
+    grid_axis_values,
+    state_global_index,
+    state_global_index_batch,
+)
+
+GRIDS = {
+    'uniform': (np.arange(-np.pi, np.pi + 0.025, 0.025),
+                np.arange(-np.pi, np.pi + 0.05, 0.05)),
+    'clustered': (grid_axis_values(-np.pi, np.pi, 0.1, cluster=2.0),
+                  grid_axis_values(-4.0, 2.0, 0.2, cluster=1.0)),
+}
+
+
+def _states(x1, x2, n=2000):
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(-4.0, 4.0, n),
+                         rng.uniform(-5.0, 5.0, n)])
+    # punkty siatki i środki przedziałów (remisy)
+    mid1 = (x1[:-1] + x1[1:]) / 2
+    mid2 = (x2[:-1] + x2[1:]) / 2
+    k = min(len(mid1), len(mid2))
+    extra = np.column_stack([np.concatenate([x1[:k], mid1[:k]]),
+                             np.concatenate([x2[:k], mid2[:k]])])
+    return np.vstack([X, extra])
+
+
+@pytest.mark.parametrize('name', GRIDS)
+def test_batch_index_matches_reference(name):
+    x1, x2 = GRIDS[name]
+    X = _states(x1, x2)
+    expected = np.array([state_global_index(x, x1, x2, len(x2)) for x in X])
+    assert np.array_equal(state_global_index_batch(X, x1, x2, len(x2)),
+                          expected)
+
+
+@pytest.mark.parametrize('name', GRIDS)
+def test_state_grid_matches_reference(name):
+    x1, x2 = GRIDS[name]
+    X = _states(x1, x2)
+    grid = StateGrid(x1, x2)
+    expected = state_global_index_batch(X, x1, x2, len(x2))
+    assert np.array_equal(grid.index_batch(X), expected)
+    assert np.array_equal([grid.index(x) for x in X], expected)
@@ -0,0 +1,18 @@
+import numpy as np
+
+from trajectory import TrajectoryRecorder, load_trajectory
+
+
+def _record(directory, steps, chunk_size=1000, dt=0.02):
+    with TrajectoryRecorder(str(directory), chunk_size) as recorder:
+        for n in range(steps):
+            recorder.record(n * dt, (0.1, 0.2), 0.5, n, 0)
+
+
+def test_second_recording_replaces_first(tmp_path):
+    _record(tmp_path, 2500)
+    _record(tmp_path, 500)
+    data = load_trajectory(str(tmp_path))
+    assert len(data['t']) == 500
+    assert np.allclose(np.diff(data['t']), 0.02)
+    assert np.array_equal(data['cell'], np.arange(500))
@@ -1,3 +1,5 @@
+import bisect
+
 import numpy as np
 
 
@@ -14,6 +16,10 @@ def state_global_index(x, x1, x2, n_x2):
 
     Zwraca:
         int: Globalny indeks
+
+    Wersja referencyjna (przeszukiwanie całej siatki, dowolne rosnące osie,
+    także niejednorodne); w pętlach uczenia i symulacji należy używać
+    StateGrid.index.
     """
     import numpy as np
 
@@ -28,6 +34,255 @@ def state_global_index(x, x1, x2, n_x2):
     return indeks
 
 
+def state_global_index_batch(x, x1, x2, n_x2):
+    """
+    Wsadowa wersja state_global_index dla wielu stanów naraz.
+
+    Argumenty:
+        x (array-like): stany X o kształcie (N, 2)
+        x1 (array-like): lista możliwych wartości stanu kąta
+        x2 (array-like): lista możliwych wartości stanu prędkości kątowej
+        n_x2 (int): Liczba wartości x2
+
+    Zwraca:
+        ndarray: Globalne indeksy o kształcie (N,)
+    """
+    x = np.asarray(x)
+    x1 = np.asarray(x1)
+    x2 = np.asarray(x2)
+
+    ip = np.argmin((x[:, 0, None] - x1) ** 2, axis=1)
+    jp = np.argmin((x[:, 1, None] - x2) ** 2, axis=1)
+    return n_x2 * ip + jp
+
+
+class GridAxis:
+    """
+    Oś siatki stanu.
+
+    Dla osi jednorodnej indeks najbliższego punktu siatki wyznaczany jest
+    arytmetycznie (przesunięcie, skala, obcięcie), dla niejednorodnej -
+    przeszukiwaniem binarnym. W obu przypadkach wynik rozstrzygany jest
+    porównaniem odległości do dwóch sąsiednich punktów i jest identyczny z
+    np.argmin((v - values)**2), łącznie z wartościami spoza zakresu i
+    remisami (wybierany jest mniejszy indeks), o ile |v| jest na tyle małe,
+    że kwadraty odległości do kolejnych punktów są rozróżnialne
+    (w praktyce |v| < 1e12).
+
+    Argumenty:
+        values (array-like): rosnące wartości osi
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 1 or len(values) < 2:
+            raise ValueError("Grid axis must have at least two points.")
+        step = np.diff(values)
+        if not np.all(step > 0):
+            raise ValueError("Grid axis must be increasing.")
+
+        self.values = values
+        self.n = len(values)
+        self.uniform = bool(np.allclose(step, step[0], rtol=1e-6, atol=0))
+        self.start = float(values[0])
+        self.inv_step = (self.n - 1) / float(values[-1] - values[0])
+        self._values = values.tolist()  # wartości float dla ścieżki skalarnej
+
+    def index(self, v):
+        """Indeks najbliższego punktu osi dla skalara v."""
+        values = self._values
+        last = self.n - 2
+        if self.uniform:
+            t = (v - self.start) * self.inv_step
+            if t <= 0:
+                k = 0
+            elif t >= last:
+                k = last
+            else:
+                k = int(t)
+        else:
+            k = min(max(bisect.bisect_right(values, v) - 1, 0), last)
+        d0 = v - values[k]
+        d1 = v - values[k + 1]
+        if d1 * d1 < d0 * d0:
+            k += 1
+        return k
+
+    def index_batch(self, v):
+        """Indeksy najbliższych punktów osi dla tablicy v."""
+        v = np.asarray(v, dtype=float)
+        if self.uniform:
+            t = np.clip((v - self.start) * self.inv_step, 0, self.n - 2)
+            k = t.astype(np.intp)
+        else:
+            k = np.clip(np.searchsorted(self.values, v, side='right') - 1,
+                        0, self.n - 2)
+        d0 = v - self.values[k]
+        d1 = v - self.values[k + 1]
+        k += d1 * d1 < d0 * d0
+        return k
+
+    def bracket(self, v):
+        """
+        Przedział interpolacji liniowej dla skalara v: indeks k lewego
+        punktu i waga w prawego punktu (v poza zakresem - w obcięte do
+        [0, 1]).
+        """
+        values = self._values
+        if self.uniform:
+            t = (v - self.start) * self.inv_step
+            k = min(max(int(t), 0), self.n - 2)
+        else:
+            k = min(max(bisect.bisect_right(values, v) - 1, 0), self.n - 2)
+        w = (v - values[k]) / (values[k + 1] - values[k])
+        return k, min(max(w, 0.0), 1.0)
+
+    def bracket_batch(self, v):
+        """Przedziały interpolacji (k, w) dla tablicy v."""
+        v = np.asarray(v, dtype=float)
+        if self.uniform:
+            k = np.clip((v - self.start) * self.inv_step, 0,
+                        self.n - 2).astype(np.intp)
+        else:
+            k = np.clip(np.searchsorted(self.values, v, side='right') - 1,
+                        0, self.n - 2)
+        lo = self.values[k]
+        w = np.clip((v - lo) / (self.values[k + 1] - lo), 0.0, 1.0)
+        return k, w
+
+
+class StateGrid:
+    """
+    Dyskretyzacja przestrzeni stanu [kąt, prędkość kątowa].
+
+    Globalny indeks stanu ma postać n_x2 * i + j, tak jak w
+    state_global_index.
+
+    Argumenty:
+        x1 (array-like): lista możliwych wartości stanu kąta
+        x2 (array-like): lista możliwych wartości stanu prędkości kątowej
+    """
+
+    def __init__(self, x1, x2):
+        self.axis1 = GridAxis(x1)
+        self.axis2 = GridAxis(x2)
+        self.x1 = self.axis1.values
+        self.x2 = self.axis2.values
+        self.n_x1 = self.axis1.n
+        self.n_x2 = self.axis2.n
+        self.n_states = self.n_x1 * self.n_x2
+
+    def index(self, x):
+        """Globalny indeks stanu x = [kąt, prędkość kątowa]."""
+        return (self.n_x2 * self.axis1.index(x[0])
+                + self.axis2.index(x[1]))
+
+    def index_batch(self, x):
+        """Globalne indeksy dla stanów o kształcie (N, 2)."""
+        x = np.asarray(x, dtype=float)
+        return (self.n_x2 * self.axis1.index_batch(x[:, 0])
+                + self.axis2.index_batch(x[:, 1]))
+
+    def map(self, values):
+        """
+        Wartości komórek (n_states,) jako macierz (n_x2, n_x1) do wykresów
+        contourf(x1, x2, ...) i pcolormesh(x1, x2, ...).
+        """
+        return np.asarray(values).reshape((self.n_x1, self.n_x2)).T
+
+    def unravel(self, k):
+        """Zamiana indeksu globalnego na parę (i, j)."""
+        return divmod(k, self.n_x2)
+
+    def point(self, k):
+        """Współrzędne [kąt, prędkość kątowa] punktu siatki o indeksie k."""
+        i, j = divmod(k, self.n_x2)
+        return self.x1[i], self.x2[j]
+
+
+def grid_axis_values(lo, hi, step, cluster=0.0):
+    """
+    Wartości osi siatki od lo do hi o nominalnym kroku step.
+
+    Przy cluster=0 wynik jest równy np.arange(lo, hi + step, step), tak
+    jak dotychczasowa siatka. Przy cluster > 0 punkty zagęszczane są w
+    pobliżu zera (pion wahadła, zerowa prędkość) odwzorowaniem
+    v -> L sinh(cluster v / L) / sinh(cluster), gdzie L to skrajny punkt
+    siatki jednorodnej po tej samej stronie zera; krok przy zerze jest
+    cosh(cluster) razy mniejszy niż na brzegach, a liczba punktów i
+    skrajne punkty są takie jak przy cluster=0 (ostatni punkt może, jak
+    w np.arange, przekraczać hi o mniej niż step).
+    """
+    if not (step > 0 and lo < hi):
+        raise ValueError("Grid axis requires lo < hi and a positive step.")
+    values = np.arange(lo, hi + step, step)
+    if cluster == 0:
+        return values
+    if not (cluster > 0 and lo < 0 < hi):
+        raise ValueError(
+            "Grid clustering requires cluster > 0 and lo < 0 < hi.")
+    L = np.where(values > 0, values[-1], -values[0])
+    return L * np.sinh(cluster * values / L) / np.sinh(cluster)
+
+
+class GridSpec:
+    """
+    Specyfikacja siatki stanu [kąt, prędkość kątowa].
+
+    Kąt obejmuje zawsze zakres [-π, π] (normalize_fi), prędkość kątowa
+    zakres [x2_min, x2_max]; stany spoza zakresu przypisywane są do
+    skrajnych punktów siatki.
+
+    Argumenty:
+        dx1, dx2 (float): nominalny krok siatki kąta i prędkości kątowej
+        x2_min, x2_max (float): zakres prędkości kątowej (może być
+            niesymetryczny)
+        cluster1, cluster2 (float): zagęszczenie siatki w pobliżu zera
+            (0 - siatka jednorodna, patrz grid_axis_values)
+    """
+
+    def __init__(self, dx1=0.025, dx2=0.05, x2_min=-np.pi, x2_max=np.pi,
+                 cluster1=0.0, cluster2=0.0):
+        self.dx1 = float(dx1)
+        self.dx2 = float(dx2)
+        self.x2_min = float(x2_min)
+        self.x2_max = float(x2_max)
+        self.cluster1 = float(cluster1)
+        self.cluster2 = float(cluster2)
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Specyfikacja z kluczy konfiguracji trenera (DEFAULT_CONFIG)."""
+        return cls(cfg['dx1'], cfg['dx2'], cfg['x2_min'], cfg['x2_max'],
+                   cfg['cluster1'], cfg['cluster2'])
+
+    def axes(self):
+        """Wartości osi (x1, x2)."""
+        x1 = grid_axis_values(-np.pi, np.pi, self.dx1, self.cluster1)
+        x2 = grid_axis_values(self.x2_min, self.x2_max, self.dx2,
+                              self.cluster2)
+        return x1, x2
+
+    def build(self):
+        """Siatka StateGrid o tej specyfikacji."""
+        return StateGrid(*self.axes())
+
+
+def set_state_ticks(ax, x2):
+    """
+    Opis osi wykresu w przestrzeni stanu (współrzędne fizyczne): kąt
+    -π, 0, π oraz te z wartości -π, 0, π, które mieszczą się w zakresie
+    prędkości kątowej x2.
+    """
+    ax.set_xticks([-np.pi, 0, np.pi])
+    ax.set_xticklabels(['-π', '0', 'π'])
+    ticks = [(v, label) for v, label in ((-np.pi, '-π'), (0, '0'),
+                                         (np.pi, 'π'))
+             if x2[0] <= v <= x2[-1]]
+    ax.set_yticks([v for v, _ in ticks])
+    ax.set_yticklabels([label for _, label in ticks])
+
+
 def normalize_fi(fi):
     """
     Normalize angle fi to the range [-pi, pi).
@@ -47,6 +302,43 @@ def normalize_fi(fi):
     return fi
 
 
+def normalize_fi_batch(fi):
+    """
+    Batched normalize_fi: normalize an array of angles to [-pi, pi).
+
+    Args:
+        fi (ndarray): Angles in radians.
+
+    Returns:
+        ndarray: Normalized angles in radians.
+    """
+    fi = np.asarray(fi, dtype=float)
+    fi = np.where(fi >= np.pi, -np.pi + (fi - np.pi), fi)
+    fi = np.where(fi < -np.pi, np.pi - (-np.pi - fi), fi)
+    return fi
+
+
+def rhs_batch(rhs, x, u):
+    """
+    Evaluate rhs for a batch of states.
+
+    Models marked with the attribute ``batched = True`` accept states of
+    shape (N, 2) and controls of shape (N,) directly; any other rhs is
+    evaluated row by row.
+
+    Args:
+        rhs (callable): Function rhs(x, u) returning dx/dt.
+        x (ndarray): States, shape (N, n).
+        u (ndarray): Controls, shape (N,).
+
+    Returns:
+        ndarray: Derivatives, shape (N, n).
+    """
+    if getattr(rhs, 'batched', False):
+        return rhs(x, u)
+    return np.array([rhs(xi, ui) for xi, ui in zip(x, u)], dtype=float)
+
+
 def rk_4(rhs, dt, x, u):
     """
     Runge-Kutta 4th order integrator.
@@ -59,8 +351,16 @@ def rk_4(rhs, dt, x, u):
 
     Returns:
         array-like: Next state after time step dt.
+
+    If rhs provides a scalar variant (attribute ``scalar`` taking and
+    returning plain floats: scalar(theta, theta_dot, u) ->
+    (theta_dot, theta_ddot)) and x is a single 2-element state, the step
+    is computed on Python floats without temporary arrays. The result is
+    identical to the array path.
     """
-    import numpy as np
+    scalar = getattr(rhs, 'scalar', None)
+    if scalar is not None and np.shape(x) == (2,) and np.ndim(u) == 0:
+        return _rk_4_scalar(scalar, dt, x, u)
 
     x = np.asarray(x)
     k1 = rhs(x, u)
@@ -71,6 +371,224 @@ def rk_4(rhs, dt, x, u):
     return xn
 
 
+def _rk_4_scalar(scalar, dt, x, u):
+    """RK4 step for a 2-element state using a scalar rhs variant."""
+    x0 = float(x[0])
+    x1 = float(x[1])
+    u = float(u)
+    h2 = dt/2
+    a1, b1 = scalar(x0, x1, u)
+    a2, b2 = scalar(x0 + h2 * a1, x1 + h2 * b1, u)
+    a3, b3 = scalar(x0 + h2 * a2, x1 + h2 * b2, u)
+    a4, b4 = scalar(x0 + dt * a3, x1 + dt * b3, u)
+    h6 = dt/6
+    return np.array([x0 + h6 * (a1 + 2*a2 + 2*a3 + a4),
+                     x1 + h6 * (b1 + 2*b2 + 2*b3 + b4)])
+
+
+def rk_4_batch(rhs, dt, x, u):
+    """
+    Runge-Kutta 4th order integrator for a batch of states.
+
+    Args:
+        rhs (callable): Function rhs(x, u) returning dx/dt.
+        dt (float): Time step.
+        x (ndarray): Current states, shape (N, n).
+        u (ndarray): Controls, shape (N,).
+
+    Returns:
+        ndarray: Next states after time step dt, shape (N, n).
+    """
+    x = np.asarray(x, dtype=float)
+    k1 = rhs_batch(rhs, x, u)
+    k2 = rhs_batch(rhs, x + dt/2 * k1, u)
+    k3 = rhs_batch(rhs, x + dt/2 * k2, u)
+    k4 = rhs_batch(rhs, x + dt * k3, u)
+    xn = x + dt/6 * (k1 + 2*k2 + 2*k3 + k4)
+    return xn
+
+
+def euler(rhs, dt, x, u):
+    """
+    Explicit Euler integrator (one rhs evaluation per step).
+
+    Args:
+        rhs (callable): Function rhs(x, u) returning dx/dt.
+        dt (float): Time step.
+        x (array-like): Current state.
+        u (array-like): Input/control.
+
+    Returns:
+        array-like: Next state after time step dt.
+    """
+    scalar = getattr(rhs, 'scalar', None)
+    if scalar is not None and np.shape(x) == (2,) and np.ndim(u) == 0:
+        x0 = float(x[0])
+        x1 = float(x[1])
+        a, b = scalar(x0, x1, float(u))
+        return np.array([x0 + dt * a, x1 + dt * b])
+
+    x = np.asarray(x)
+    return x + dt * rhs(x, u)
+
+
+def euler_batch(rhs, dt, x, u):
+    """
+    Explicit Euler integrator for a batch of states.
+
+    Args:
+        rhs (callable): Function rhs(x, u) returning dx/dt.
+        dt (float): Time step.
+        x (ndarray): Current states, shape (N, n).
+        u (ndarray): Controls, shape (N,).
+
+    Returns:
+        ndarray: Next states after time step dt, shape (N, n).
+    """
+    x = np.asarray(x, dtype=float)
+    return x + dt * rhs_batch(rhs, x, u)
+
+
+def semi_implicit_euler(rhs, dt, x, u):
+    """
+    Semi-implicit (symplectic) Euler integrator for a state
+    [position, velocity]: the velocity is advanced first and the new
+    velocity is used to advance the position. One rhs evaluation per step;
+    the energy of undamped oscillations does not drift as with explicit
+    Euler.
+
+    Args:
+        rhs (callable): Function rhs(x, u) returning [velocity,
+            acceleration].
+        dt (float): Time step.
+        x (array-like): Current state [position, velocity].
+        u (array-like): Input/control.
+
+    Returns:
+        array-like: Next state after time step dt.
+    """
+    scalar = getattr(rhs, 'scalar', None)
+    if scalar is not None and np.shape(x) == (2,) and np.ndim(u) == 0:
+        x0 = float(x[0])
+        x1 = float(x[1])
+        _, b = scalar(x0, x1, float(u))
+        x1 = x1 + dt * b
+        return np.array([x0 + dt * x1, x1])
+
+    x = np.asarray(x, dtype=float)
+    velocity = x[1] + dt * rhs(x, u)[1]
+    return np.array([x[0] + dt * velocity, velocity])
+
+
+def semi_implicit_euler_batch(rhs, dt, x, u):
+    """
+    Semi-implicit (symplectic) Euler integrator for a batch of states.
+
+    Args:
+        rhs (callable): Function rhs(x, u) returning [velocity,
+            acceleration].
+        dt (float): Time step.
+        x (ndarray): Current states [position, velocity], shape (N, 2).
+        u (ndarray): Controls, shape (N,).
+
+    Returns:
+        ndarray: Next states after time step dt, shape (N, 2).
+    """
+    x = np.asarray(x, dtype=float)
+    xn = np.empty_like(x)
+    xn[:, 1] = x[:, 1] + dt * rhs_batch(rhs, x, u)[:, 1]
+    xn[:, 0] = x[:, 0] + dt * xn[:, 1]
+    return xn
+
+
+# Rejestr integratorów: nazwa -> (krok dla jednego stanu, krok wsadowy).
+# Wszystkie mają sygnaturę step(rhs, dt, x, u).
+INTEGRATORS = {
+    'euler': (euler, euler_batch),
+    'semi_implicit_euler': (semi_implicit_euler, semi_implicit_euler_batch),
+    'rk4': (rk_4, rk_4_batch),
+}
+
+
+def get_integrator(name='rk4', substeps=1):
+    """
+    Integrator z rejestru INTEGRATORS.
+
+    Argumenty:
+        name (str): nazwa integratora
+        substeps (int): liczba podkroków o długości dt / substeps w jednym
+            kroku sterowania (sterowanie stałe w całym kroku); przydatne
+            dla modeli sztywnych, np. wahadła z odbojnikami
+
+    Zwraca:
+        tuple: (step, step_batch) o sygnaturze step(rhs, dt, x, u)
+    """
+    if name not in INTEGRATORS:
+        raise ValueError(
+            f"Integrator must be one of {list(INTEGRATORS)}, got '{name}'.")
+    if not (int(substeps) == substeps and substeps >= 1):
+        raise ValueError("substeps must be a positive integer.")
+    step, step_batch = INTEGRATORS[name]
+    substeps = int(substeps)
+    if substeps == 1:
+        return step, step_batch
+
+    def substep(rhs, dt, x, u):
+        h = dt / substeps
+        for _ in range(substeps):
+            x = step(rhs, h, x, u)
+        return x
+
+    def substep_batch(rhs, dt, x, u):
+        h = dt / substeps
+        for _ in range(substeps):
+            x = step_batch(rhs, h, x, u)
+        return x
+
+    return substep, substep_batch
+
+
+def linearize_batch(RHS, x, u, delta=1.0e-6):
+    """
+    Macierze A = df/dx i B = df/du dla wielu stanów naraz.
+
+    Jeżeli model ma zarejestrowany jakobian analityczny (atrybut
+    ``jacobian``, patrz dynamics.py), zwracany jest jego wynik. W
+    przeciwnym razie stosowane są różnice centralne: wszystkie 2(n + 1)
+    zaburzone punkty dla wszystkich stanów obliczane są jednym wywołaniem
+    rhs_batch.
+
+    Argumenty:
+        RHS (callable): funkcja prawej strony RHS(x, u), sterowanie skalarne
+        x (array-like): stany o kształcie (N, n)
+        u (array-like): sterowania o kształcie (N,) lub skalar
+        delta (float): krok różnic centralnych
+
+    Zwraca:
+        A (ndarray): (N, n, n)
+        B (ndarray): (N, n, 1)
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    N, n = x.shape
+    u = np.broadcast_to(np.asarray(u, dtype=float), (N,))
+    jacobian = getattr(RHS, 'jacobian', None)
+    if jacobian is not None:
+        return jacobian(x, u)
+
+    # punkty: x + e_j, x - e_j (j = 1..n), (x, u + delta), (x, u - delta)
+    E = delta * np.eye(n)
+    X = np.concatenate([x[:, None, :] + E, x[:, None, :] - E,
+                        np.repeat(x[:, None, :], 2, axis=1)], axis=1)
+    U = np.repeat(u[:, None], 2 * n + 2, axis=1)
+    U[:, 2 * n] += delta
+    U[:, 2 * n + 1] -= delta
+    F = rhs_batch(RHS, X.reshape(-1, n), U.reshape(-1))
+    F = F.reshape(N, 2 * n + 2, n)
+    A = (F[:, :n] - F[:, n:2 * n]).transpose(0, 2, 1) / (2 * delta)
+    B = (F[:, 2 * n] - F[:, 2 * n + 1])[:, :, None] / (2 * delta)
+    return A, B
+
+
 def aw_matrices_AB(RHS, x, t, u, n, m):
     """
     Numeryczna aproksymacja macierzy A i B dla układu nieliniowego.
@@ -80,23 +598,29 @@ def aw_matrices_AB(RHS, x, t, u, n, m):
     u: wektor sterowania (1D array)
     n: liczba zmiennych stanu
     m: liczba sterowań
-    """
-    x = np.asarray(x).flatten()
-    u = np.asarray(u).flatten()
-    delta = 1.0e-6
 
-    f0 = RHS(x, u)
+    Modele z dynamics.py przyjmują sterowanie skalarne, dlatego dla m = 1
+    do RHS przekazywana jest liczba zamiast wektora jednoelementowego, a
+    macierze wyznacza linearize_batch (jakobian analityczny modelu lub
+    różnice centralne w jednym wywołaniu).
+    """
+    x = np.asarray(x, dtype=float).flatten()
+    u = np.asarray(u, dtype=float).flatten()
+    if m == 1:
+        A, B = linearize_batch(RHS, x[None, :], u[:1])
+        return A[0], B[0]
 
-    A = np.zeros((n, n))
+    delta = 1.0e-6
+    A = np.empty((n, n))
     for j in range(n):
         dx = np.zeros(n)
         dx[j] = delta
-        A[:, j] = (RHS(x + dx, u) - f0) / delta
+        A[:, j] = (RHS(x + dx, u) - RHS(x - dx, u)) / (2 * delta)
 
-    B = np.zeros((n, m))
+    B = np.empty((n, m))
     for j in range(m):
         du = np.zeros(m)
         du[j] = delta
-        B[:, j] = (RHS(x, u + du) - f0) / delta
+        B[:, j] = (RHS(x, u + du) - RHS(x, u - du)) / (2 * delta)
 
     return A, B
@@ -0,0 +1,898 @@
+"""
+Silnik uczenia Q bez interfejsu graficznego.
+
+Moduł nie importuje ani matplotlib, ani tkinter, dzięki czemu uczenie można
+uruchamiać na maszynach bez ekranu. Interfejs graficzny (learning.py)
+dołącza się do trenera jako obserwator.
+"""
+import time
+
+import numpy as np
+
+from dynamics import (
+    dynamics0,
+    dynamics1,
+    dynamics2,
+    dynamics3,
+    dynamics4,
+    dynamics5,
+    dynamics6,
+    dynamics7,
+    dynamicsS,
+)
+
+from dyna import TransitionMemory
+from profiling import PhaseProfiler
+from toolbox import (
+    GridSpec,
+    StateGrid,
+    get_integrator,
+    normalize_fi,
+    normalize_fi_batch,
+)
+
+tasks = {
+    'Wahadło proste': dynamics0,
+    'Wahadło z tarciem suchym': dynamics1,
+    'Wahadło z nieliniową sprężyną skrętną': dynamics2,
+    'Wahadło z luzem': dynamics3,
+    'Wahadło z odbojnikami': dynamics4,
+    'Wahadło ze zmienną masą': dynamics5,
+    'Wahadło z zaburzeniami losowymi': dynamics6,
+    'Wahadło ze zmienną długością': dynamics7,
+    'Huśtawka': dynamicsS,
+}
+
+tasks_names = list(tasks.keys())
+
+controls = {
+    'Bang-bang': np.array([-1, 1]),
+    'Bang-zero-bang': np.array([0, -1, 1]),
+    'Dyskretne 5': np.array([-1, -0.5, 0, 0.5, 1]),
+    'Dyskretne 21': np.linspace(-1, 1, 21)
+}
+
+controls_names = list(controls.keys())
+
+# Domyślna konfiguracja uczenia (wartości jak w oknie dialogowym)
+DEFAULT_CONFIG = {
+    'label': 'Run 0',
+    'dynamics': tasks_names[0],
+    'control': controls_names[0],
+    'u_max': 1.0,
+    'epsil': 0.5,
+    'alpha': 0.99,
+    'Qx1': 1.0,
+    'Qx2': 0.25,
+    'Ru1': 0.0,
+    'maxit': 1000,
+    'gamma': 0.9,
+    'epsilDecay': 1.0,
+    'dt': 0.1,
+    'maxEpisodes': 15000,
+    'dx1': 0.025,
+    'dx2': 0.05,
+    'x2_min': -np.pi,
+    'x2_max': np.pi,
+    'cluster1': 0.0,
+    'cluster2': 0.0,
+    'q_dtype': 'float64',
+    'integrator': 'rk4',
+    'substeps': 1,
+    'planning_steps': 0,
+    'planning_every': 'step',
+    'memory_size': 100000,
+    'method': 'qlearning',
+    'lam': 0.9,
+    'trace_tol': 1e-3,
+    'n_envs': 1,
+    'profile': False,
+    'rel_tol': None,
+    'window': 100,
+    'policy_patience': None,
+    'max_seconds': None,
+    'max_steps': None,
+}
+
+
+# Metody uczenia: Q-learning, SARSA, SARSA(lambda), Q(lambda) Watkinsa
+METHODS = ('qlearning', 'sarsa', 'sarsa_lambda', 'q_lambda')
+
+
+def state_reward(x1, x2, Qx1, Qx2):
+    """
+    Nagroda za stan dla każdego punktu siatki (indeks globalny
+    n_x2 * i + j).
+
+    Parametry:
+        x1 : ndarray
+            Wartości kąta na siatce
+        x2 : ndarray
+            Wartości prędkości kątowej na siatce
+        Qx1, Qx2 : float
+            Wagi kary za kąt i prędkość kątową
+
+    Zwraca:
+        rx : ndarray
+            Wektor nagród o długości n_x1 * n_x2
+    """
+    x1 = np.asarray(x1)
+    x2 = np.asarray(x2)
+    return -(x1[:, None]**2 * Qx1 + x2[None, :]**2 * Qx2).ravel()
+
+
+class QLearnTrainer:
+    """
+    Uczenie Q-funkcji dla wahadła na zdyskretyzowanej przestrzeni stanu.
+
+    Trener przechowuje Q, V, U oraz historię metryk. Po każdym epizodzie
+    wywołuje kolejno obserwatorów observer(trainer); obserwator może
+    zakończyć uczenie wywołując trainer.request_stop().
+
+    Parametry:
+        dynamics : callable
+            Prawa strona równania ruchu dynamics(x, u)
+        control : array-like
+            Dyskretne wartości sterowania
+        x1, x2 : array-like
+            Siatka kąta i prędkości kątowej (rosnąca, także niejednorodna;
+            patrz GridSpec)
+        alpha, gamma : float
+            Współczynnik uczenia i współczynnik dyskontowania
+        epsil, epsilDecay : float
+            Prawdopodobieństwo eksploracji i jego zanik na krok
+        Qx1, Qx2, Ru1 : float
+            Wagi funkcji nagrody
+        dt : float
+            Krok czasowy całkowania
+        maxit : int
+            Maksymalna liczba kroków w epizodzie
+        maxEpisodes : int
+            Maksymalna liczba epizodów
+        x_InitCond : array-like
+            Stan początkowy każdego epizodu
+        observers : list
+            Obserwatorzy wywoływani po każdym epizodzie
+        n_envs : int
+            Liczba równoległych przebiegów w trybie wsadowym (1 - tryb
+            klasyczny). W trybie wsadowym jeden epizod obejmuje n_envs
+            przebiegów prowadzonych krok w krok, a epsilon maleje raz na
+            wspólny krok.
+        collisions : str
+            Sposób łączenia aktualizacji tej samej pary (stan, sterowanie)
+            w jednym kroku wsadowym: 'mean' (średnia poprawek) lub 'add'
+            (suma poprawek, np.add.at; przy dużym alpha i wielu
+            kolizjach może być niestabilna)
+        full_statistics : bool
+            Pełne przeliczanie V, U i norm po każdym epizodzie zamiast
+            aktualizacji tylko zmienionych wierszy Q (do weryfikacji)
+        profile : bool
+            Pomiar czasu faz pętli uczenia (trainer.profiler, patrz
+            profiling.py); wyłączony nie wpływa na wydajność
+        rel_tol, window : float, int
+            Zatrzymanie, gdy |dVmean| i |dQmean| w ostatnich `window`
+            epizodach są mniejsze niż rel_tol (None - wyłączone)
+        policy_patience : int
+            Zatrzymanie, gdy strategia U nie zmieniła się przez tyle
+            kolejnych epizodów (None - wyłączone)
+        max_seconds : float
+            Limit czasu uczenia [s] (None - brak)
+        max_steps : int
+            Limit łącznej liczby kroków symulacji (None - brak)
+        q_dtype : dtype
+            Typ zmiennoprzecinkowy tablicy Q (np. 'float32', 'float16');
+            mniejszy typ zmniejsza zużycie pamięci kosztem dokładności
+            aktualizacji. Statystyki liczone są zawsze w float64.
+        integrator, substeps : str, int
+            Integrator z toolbox.INTEGRATORS ('euler',
+            'semi_implicit_euler', 'rk4') i liczba jego podkroków na
+            jeden krok sterowania dt
+        planning_steps : int
+            Dyna-Q: liczba aktualizacji Q na przejściach losowanych z
+            pamięci (dyna.TransitionMemory) po każdym kroku lub epizodzie
+            (0 - wyłączone)
+        planning_every : str
+            'step' (po każdym rzeczywistym kroku) lub 'episode'
+        memory_size : int
+            Pojemność pamięci przejść Dyna-Q
+        method : str
+            Metoda uczenia z METHODS: 'qlearning' (jednokrokowy
+            Q-learning), 'sarsa', 'sarsa_lambda' lub 'q_lambda'
+            (Q(lambda) Watkinsa); metody inne niż 'qlearning' wymagają
+            n_envs = 1
+        lam, trace_tol : float
+            Współczynnik zaniku śladów aktywności i próg, poniżej którego
+            ślad jest usuwany (ślady przechowywane rzadko, tylko dla
+            ostatnio odwiedzonych par)
+
+    Powód zakończenia uczenia zapisywany jest w trainer.stop_reason:
+    'maxEpisodes', 'user', 'rel_tol', 'policy_stable', 'max_seconds'
+    lub 'max_steps'.
+
+    Atrybut `locks` (lista blokad, domyślnie None) włącza blokowanie
+    aktualizacji Q - wiersz k_x chroniony jest blokadą locks[k_x %
+    len(locks)]. Używane przy wspólnej tablicy Q kilku procesów
+    (parallel.py).
+    """
+
+    def __init__(self, dynamics, control, x1, x2, alpha=0.99, gamma=0.9,
+                 epsil=0.5, epsilDecay=1.0, Qx1=1.0, Qx2=0.25, Ru1=0.0,
+                 dt=0.1, maxit=1000, maxEpisodes=15000,
+                 x_InitCond=(np.pi, 0.0), observers=None, n_envs=1,
+                 collisions='mean', full_statistics=False, profile=False,
+                 rel_tol=None, window=100, policy_patience=None,
+                 max_seconds=None, max_steps=None, q_dtype=np.float64,
+                 integrator='rk4', substeps=1, planning_steps=0,
+                 planning_every='step', memory_size=100000,
+                 method='qlearning', lam=0.9, trace_tol=1e-3):
+        control = np.asarray(control, dtype=float)
+
+        # Sprawdzenie poprawności danych wejściowych
+        if not (0 < epsil <= 1):
+            raise ValueError("Epsilon must be in the range (0, 1].")
+        if not (0 < alpha <= 1):
+            raise ValueError("Alpha must be in the range (0, 1].")
+        if not (0 < gamma <= 1):
+            raise ValueError("Gamma must be in the range (0, 1].")
+        if not (0 <= Ru1):
+            raise ValueError("Ru1 must be non-negative.")
+        if not (0 < dt):
+            raise ValueError("dt must be positive.")
+        if not (maxit > 0):
+            raise ValueError("maxit must be a positive integer.")
+        if not (len(control) > 0):
+            raise ValueError("Control array must not be empty.")
+        if not (n_envs >= 1):
+            raise ValueError("n_envs must be a positive integer.")
+        if collisions not in ('add', 'mean'):
+            raise ValueError("collisions must be 'add' or 'mean'.")
+        if not (window >= 1):
+            raise ValueError("window must be a positive integer.")
+        if np.dtype(q_dtype).kind != 'f':
+            raise ValueError("q_dtype must be a floating point type.")
+        if not (planning_steps >= 0):
+            raise ValueError("planning_steps must be non-negative.")
+        if planning_every not in ('step', 'episode'):
+            raise ValueError("planning_every must be 'step' or 'episode'.")
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {list(METHODS)}.")
+        if method != 'qlearning' and n_envs > 1:
+            raise ValueError(f"method '{method}' requires n_envs = 1.")
+        if not (0 <= lam <= 1):
+            raise ValueError("lam must be in the range [0, 1].")
+        if not (0 < trace_tol < 1):
+            raise ValueError("trace_tol must be in the range (0, 1).")
+
+        self.dynamics = dynamics
+        self.control = control
+        self.integrator = integrator
+        self.substeps = int(substeps)
+        self.step, self.step_batch = get_integrator(integrator, substeps)
+        self.grid = StateGrid(x1, x2)
+        self.x1 = self.grid.x1
+        self.x2 = self.grid.x2
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsil = epsil
+        self.epsilDecay = epsilDecay
+        self.Qx1 = Qx1
+        self.Qx2 = Qx2
+        self.Ru1 = Ru1
+        self.dt = dt
+        self.maxit = int(maxit)
+        self.maxEpisodes = int(maxEpisodes)
+        self.x_InitCond = np.array(x_InitCond, dtype=float)
+        self.observers = list(observers) if observers else []
+        self.n_envs = int(n_envs)
+        self.collisions = collisions
+        self.full_statistics = full_statistics
+        self.profiler = PhaseProfiler() if profile else None
+        self.rel_tol = rel_tol
+        self.window = int(window)
+        self.policy_patience = policy_patience
+        self.max_seconds = max_seconds
+        self.max_steps = max_steps
+        self.locks = None
+        self.planning_steps = int(planning_steps)
+        self.planning_every = planning_every
+        self.memory = (TransitionMemory(memory_size)
+                       if planning_steps > 0 else None)
+        self.method = method
+        self.lam = 0.0 if method == 'sarsa' else lam
+        self.trace_tol = trace_tol
+
+        self.m_u = len(control)  # liczba dyskretnych wartości sterowania
+        self.n_x1 = self.grid.n_x1  # liczba dyskretnych wartości kąta
+        self.n_x2 = self.grid.n_x2  # liczba wartości prędkości kątowej
+        n_states = self.grid.n_states
+
+        # Funkcja nagrody
+        self.rx = state_reward(self.x1, self.x2, Qx1, Qx2)
+        self.ru = -Ru1 * control**2  # nagroda za sterowanie
+
+        # Q-funkcja (liczba stanów x liczba sterowań), V-funkcja, sterowanie
+        self.Q = np.zeros((n_states, self.m_u), dtype=q_dtype)
+        self.V = np.zeros(n_states)
+        self.U = np.full(n_states, control[0])  # argmax zerowego wiersza
+        self.Vmean = []
+        self.dVmean = []
+        self.Qmean = []
+        self.dQmean = []
+
+        self.episode = 0  # numer bieżącego epizodu
+        self.episodes_done = 0  # liczba zakończonych epizodów
+        self.steps = 0  # łączna liczba kroków symulacji
+        self.updates = 0  # łączna liczba aktualizacji Q
+        self.elapsed = 0.0  # czas uczenia [s]
+        self.stop_requested = False
+        self.stop_reason = None
+        self.policy_changes = 0  # zmiany U w ostatnim epizodzie
+        self.stable_episodes = 0  # kolejne epizody bez zmiany U
+
+        # Wiersze Q zmienione od ostatniej aktualizacji statystyk oraz sumy
+        # kwadratów potrzebne do Qmean / Vmean
+        self._dirty = np.zeros(n_states, dtype=bool)
+        self._Qrow_sq = np.zeros(n_states)
+        self._Qsq = 0.0
+        self._Vsq = 0.0
+
+    def add_observer(self, observer):
+        """Dołącza obserwatora wywoływanego po każdym epizodzie."""
+        self.observers.append(observer)
+
+    def request_stop(self):
+        """Kończy uczenie po bieżącym epizodzie."""
+        self.stop_requested = True
+
+    def run_episode(self):
+        """
+        Wykonuje jeden epizod uczenia (bez aktualizacji statystyk).
+
+        Zwraca:
+            int: liczba wykonanych kroków
+        """
+        if self.n_envs > 1:
+            return self.run_batch_episode()
+        if self.method != 'qlearning':
+            return self.run_trace_episode()
+
+        Q = self.Q
+        state_index = self.grid.index
+        control, m_u = self.control, self.m_u
+        rx, ru = self.rx, self.ru
+        alpha, gamma, dt = self.alpha, self.gamma, self.dt
+        epsil, epsilDecay = self.epsil, self.epsilDecay
+        dynamics = self.dynamics
+        step = self.step
+        dirty = self._dirty
+        locks = self.locks
+        memory = self.memory
+        plan_each_step = self.planning_every == 'step'
+        prof = self.profiler
+
+        x = np.copy(self.x_InitCond)  # inicjalizacja stanu
+
+        timestep = 0
+        for timestep in range(self.maxit):
+            if prof is not None:
+                t0 = time.perf_counter()
+            # wyznaczenie indeksu stanu
+            k_x = state_index(x)
+            if prof is not None:
+                t0 = prof.lap('index', t0)
+
+            if np.random.rand() > epsil:
+                # Eksploatacja - wybór sterowania na podstawie Q-funkcji
+                k_u = np.argmax(Q[k_x])
+            else:
+                # Eksploracja - wybór sterowania losowo
+                k_u = np.random.randint(m_u)
+            if prof is not None:
+                t0 = prof.lap('action', t0)
+
+            u = control[k_u]  # sterowanie
+            x = step(dynamics, dt, x, u)  # rozwiązanie
+            x[0] = normalize_fi(x[0])
+            if prof is not None:
+                t0 = prof.lap('integration', t0)
+            # wyznaczenie indeksu stanu po wykonaniu sterowania
+            k1_x = state_index(x)
+            if prof is not None:
+                t0 = prof.lap('index', t0)
+
+            if locks is not None:
+                lock = locks[k_x % len(locks)]
+                lock.acquire()
+            Q[k_x, k_u] += alpha * \
+                (rx[k1_x] + ru[k_u] + gamma * np.max(Q[k1_x]) - Q[k_x, k_u])
+            if locks is not None:
+                lock.release()
+            dirty[k_x] = True
+            if prof is not None:
+                t0 = prof.lap('update', t0)
+
+            if memory is not None:
+                memory.add(k_x, k_u, k1_x, rx[k1_x] + ru[k_u])
+                if plan_each_step:
+                    self.plan()
+                if prof is not None:
+                    prof.lap('planning', t0)
+
+            epsil *= epsilDecay
+
+            if np.linalg.norm(x) < 0.01:
+                break
+
+        self.epsil = epsil
+        self.steps += timestep + 1
+        self.updates += timestep + 1
+        if memory is not None and not plan_each_step:
+            self.plan()
+        return timestep + 1
+
+    def _epsilon_greedy(self, k_x, epsil):
+        """Wybór sterowania epsilon-zachłanny (jak w run_episode)."""
+        if np.random.rand() > epsil:
+            return np.argmax(self.Q[k_x])
+        return np.random.randint(self.m_u)
+
+    def run_trace_episode(self):
+        """
+        Epizod SARSA, SARSA(lambda) lub Q(lambda) Watkinsa ze śladami
+        aktywności (ślady zastępujące).
+
+        Ślady przechowywane są rzadko: indeksy par (stan, sterowanie) w
+        spłaszczonej tablicy Q i ich wartości. Po każdym kroku ślady
+        maleją o gamma * lambda, a ślady mniejsze niż trace_tol są
+        usuwane, więc koszt kroku jest proporcjonalny do długości śladu,
+        a nie do rozmiaru Q. W Q(lambda) ślady są zerowane po ruchu
+        eksploracyjnym.
+
+        Zwraca:
+            int: liczba wykonanych kroków
+        """
+        Q = self.Q
+        Q_flat = Q.reshape(-1)
+        state_index = self.grid.index
+        control, m_u = self.control, self.m_u
+        rx, ru = self.rx, self.ru
+        alpha, gamma, dt = self.alpha, self.gamma, self.dt
+        epsil, epsilDecay = self.epsil, self.epsilDecay
+        decay = gamma * self.lam
+        trace_tol = self.trace_tol
+        watkins = self.method == 'q_lambda'
+        dynamics = self.dynamics
+        step = self.step
+        dirty = self._dirty
+        locks = self.locks
+        memory = self.memory
+        plan_each_step = self.planning_every == 'step'
+        prof = self.profiler
+
+        trace_idx = np.empty(0, dtype=np.intp)  # indeksy w Q_flat
+        trace_val = np.empty(0)
+
+        x = np.copy(self.x_InitCond)
+        k_x = state_index(x)
+        k_u = self._epsilon_greedy(k_x, epsil)
+
+        timestep = 0
+        for timestep in range(self.maxit):
+            if prof is not None:
+                t0 = time.perf_counter()
+            x = step(dynamics, dt, x, control[k_u])
+            x[0] = normalize_fi(x[0])
+            if prof is not None:
+                t0 = prof.lap('integration', t0)
+            k1_x = state_index(x)
+            if prof is not None:
+                t0 = prof.lap('index', t0)
+
+            epsil *= epsilDecay
+            k1_u = self._epsilon_greedy(k1_x, epsil)
+            if prof is not None:
+                t0 = prof.lap('action', t0)
+
+            r = rx[k1_x] + ru[k_u]
+            if watkins:
+                greedy = np.argmax(Q[k1_x])
+                if Q[k1_x, k1_u] == Q[k1_x, greedy]:
+                    greedy = k1_u
+                target = Q[k1_x, greedy]
+            else:
+                target = Q[k1_x, k1_u]
+
+            # ślad zastępujący dla bieżącej pary
+            k = k_x * m_u + k_u
+            hit = trace_idx == k
+            if np.any(hit):
+                trace_val[hit] = 1.0
+            else:
+                trace_idx = np.append(trace_idx, k)
+                trace_val = np.append(trace_val, 1.0)
+
+            if locks is not None:
+                held = [locks[i] for i in np.unique(
+                    trace_idx // m_u % len(locks))]
+                for lock in held:
+                    lock.acquire()
+            delta = r + gamma * target - Q[k_x, k_u]
+            Q_flat[trace_idx] += alpha * delta * trace_val
+            if locks is not None:
+                for lock in held:
+                    lock.release()
+            dirty[trace_idx // m_u] = True
+            if prof is not None:
+                t0 = prof.lap('update', t0)
+
+            if watkins and k1_u != greedy:
+                trace_val = trace_val[:0]
+                trace_idx = trace_idx[:0]
+            else:
+                trace_val *= decay
+                keep = trace_val >= trace_tol
+                trace_val = trace_val[keep]
+                trace_idx = trace_idx[keep]
+
+            if memory is not None:
+                memory.add(k_x, k_u, k1_x, r)
+                if plan_each_step:
+                    self.plan()
+                if prof is not None:
+                    prof.lap('planning', t0)
+
+            k_x, k_u = k1_x, k1_u
+            if np.linalg.norm(x) < 0.01:
+                break
+
+        self.epsil = epsil
+        self.steps += timestep + 1
+        self.updates += timestep + 1
+        if memory is not None and not plan_each_step:
+            self.plan()
+        return timestep + 1
+
+    def run_batch_episode(self):
+        """
+        Wykonuje n_envs epizodów naraz, przechowując stany jako tablicę
+        (n_envs, 2). Przebieg, który osiągnął cel, jest wyłączany z dalszych
+        kroków.
+
+        Zwraca:
+            int: łączna liczba wykonanych kroków wszystkich przebiegów
+        """
+        Q = self.Q
+        state_index = self.grid.index_batch
+        control, m_u = self.control, self.m_u
+        rx, ru = self.rx, self.ru
+        dt = self.dt
+        epsil, epsilDecay = self.epsil, self.epsilDecay
+        dynamics = self.dynamics
+        step = self.step_batch
+        memory = self.memory
+        plan_each_step = self.planning_every == 'step'
+        prof = self.profiler
+
+        X = np.tile(self.x_InitCond, (self.n_envs, 1))
+        active = np.arange(self.n_envs)  # indeksy aktywnych przebiegów
+        steps = 0
+
+        for timestep in range(self.maxit):
+            if prof is not None:
+                t0 = time.perf_counter()
+            x = X[active]
+            n = len(active)
+            k_x = state_index(x)
+            if prof is not None:
+                t0 = prof.lap('index', t0)
+
+            # Eksploatacja lub eksploracja (osobno dla każdego przebiegu)
+            k_u = np.argmax(Q[k_x], axis=1)
+            explore = np.random.rand(n) <= epsil
+            k_u[explore] = np.random.randint(m_u, size=np.count_nonzero(
+                explore))
+            if prof is not None:
+                t0 = prof.lap('action', t0)
+
+            x = step(dynamics, dt, x, control[k_u])
+            x[:, 0] = normalize_fi_batch(x[:, 0])
+            if prof is not None:
+                t0 = prof.lap('integration', t0)
+            k1_x = state_index(x)
+            if prof is not None:
+                t0 = prof.lap('index', t0)
+
+            r = rx[k1_x] + ru[k_u]
+            self.update_batch(k_x, k_u, k1_x, r)
+            if prof is not None:
+                t0 = prof.lap('update', t0)
+
+            if memory is not None:
+                memory.add_batch(k_x, k_u, k1_x, r)
+                if plan_each_step:
+                    self.plan()
+                if prof is not None:
+                    prof.lap('planning', t0)
+
+            epsil *= epsilDecay
+            steps += n
+
+            X[active] = x
+            active = active[np.linalg.norm(x, axis=1) >= 0.01]
+            if len(active) == 0:
+                break
+
+        self.epsil = epsil
+        self.steps += steps
+        self.updates += steps
+        if memory is not None and not plan_each_step:
+            self.plan()
+        return steps
+
+    def update_batch(self, k_x, k_u, k1_x, r):
+        """
+        Aktualizacja Q dla wielu przejść (k_x, k_u, k1_x, r) naraz.
+        Powtarzające się pary (stan, sterowanie) łączone są zgodnie z
+        `collisions`.
+        """
+        Q = self.Q
+        locks = self.locks
+        if locks is not None:
+            # blokady wszystkich zmienianych pasów, w stałej kolejności
+            held = [locks[k] for k in np.unique(k_x % len(locks))]
+            for lock in held:
+                lock.acquire()
+        delta = self.alpha * (r + self.gamma * np.max(Q[k1_x], axis=1)
+                              - Q[k_x, k_u])
+        if self.collisions == 'mean':
+            # średnia z poprawek dla powtarzających się par
+            _, inverse, counts = np.unique(
+                k_x * self.m_u + k_u, return_inverse=True,
+                return_counts=True)
+            delta = delta / counts[inverse]
+        np.add.at(Q, (k_x, k_u), delta)
+        if locks is not None:
+            for lock in held:
+                lock.release()
+        self._dirty[k_x] = True
+
+    def plan(self, n=None):
+        """
+        Dyna-Q: n (domyślnie planning_steps) aktualizacji Q na
+        przejściach wylosowanych z pamięci.
+
+        Zwraca:
+            int: liczba wykonanych aktualizacji
+        """
+        memory = self.memory
+        if memory is None or len(memory) == 0:
+            return 0
+        n = self.planning_steps if n is None else n
+        self.update_batch(*memory.sample(n))
+        self.updates += n
+        return n
+
+    def refresh_statistics(self):
+        """Pełne przeliczenie V, U i sum kwadratów na podstawie całego Q."""
+        Q = self.Q.astype(float, copy=False)
+        self.V[:] = np.max(Q, axis=1)
+        U = self.control[np.argmax(Q, axis=1)]
+        self.policy_changes = np.count_nonzero(U != self.U)
+        self.U[:] = U
+        self._Qrow_sq = np.sum(Q**2, axis=1)
+        self._Qsq = np.sum(Q**2)
+        self._Vsq = np.sum(self.V**2)
+        self._dirty[:] = False
+
+    def _update_dirty_rows(self):
+        """Aktualizacja V, U i sum kwadratów tylko dla zmienionych wierszy."""
+        rows = np.flatnonzero(self._dirty)
+        self.policy_changes = 0
+        if len(rows) == 0:
+            return
+        self._dirty[rows] = False
+
+        Q_rows = self.Q[rows].astype(float, copy=False)
+        V_rows = np.max(Q_rows, axis=1)
+        row_sq = np.sum(Q_rows**2, axis=1)
+
+        self._Qsq += np.sum(row_sq) - np.sum(self._Qrow_sq[rows])
+        self._Qrow_sq[rows] = row_sq
+        self._Vsq += np.sum(V_rows**2) - np.sum(self.V[rows]**2)
+        self.V[rows] = V_rows
+        U_rows = self.control[np.argmax(Q_rows, axis=1)]
+        self.policy_changes = np.count_nonzero(U_rows != self.U[rows])
+        self.U[rows] = U_rows
+
+    def update_statistics(self, full=False):
+        """
+        Aktualizuje V, U oraz krzywe uczenia po epizodzie.
+
+        Domyślnie przeliczane są tylko wiersze Q zmienione w epizodzie,
+        a Qmean i Vmean wynikają z bieżących sum kwadratów. Przy
+        full=True (lub full_statistics) wszystko liczone jest od nowa.
+        """
+        prof = self.profiler
+        if prof is not None:
+            t0 = time.perf_counter()
+        if full or self.full_statistics:
+            self.refresh_statistics()
+        else:
+            self._update_dirty_rows()
+        if prof is not None:
+            t0 = prof.lap('policy', t0)
+
+        # przy uczeniu równoległym licznik epizodów rośnie skokami
+        has_previous = self.episode > 1 and len(self.Vmean) > 0
+        self.Vmean.append(np.sqrt(max(self._Vsq, 0.0)))
+        if has_previous:
+            self.dVmean.append(
+                (self.Vmean[-1] - self.Vmean[-2]) / self.Vmean[-1])
+
+        self.Qmean.append(np.sqrt(max(self._Qsq, 0.0)))
+        if has_previous:
+            self.dQmean.append(
+                (self.Qmean[-1] - self.Qmean[-2]) / self.Qmean[-1])
+        if self.policy_changes:
+            self.stable_episodes = 0
+        else:
+            self.stable_episodes += 1
+        if prof is not None:
+            prof.lap('statistics', t0)
+
+    def check_stopping(self):
+        """
+        Sprawdza kryteria zatrzymania po epizodzie.
+
+        Zwraca:
+            str lub None: powód zatrzymania
+        """
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            return 'max_steps'
+        if (self.max_seconds is not None
+                and self.elapsed >= self.max_seconds):
+            return 'max_seconds'
+        if (self.policy_patience is not None
+                and self.stable_episodes >= self.policy_patience):
+            return 'policy_stable'
+        if self.rel_tol is not None and len(self.dVmean) >= self.window:
+            dV = np.abs(self.dVmean[-self.window:])
+            dQ = np.abs(self.dQmean[-self.window:])
+            # NaN (np. Vmean = 0) nie spełnia warunku
+            if np.all(dV < self.rel_tol) and np.all(dQ < self.rel_tol):
+                return 'rel_tol'
+        return None
+
+    def run(self):
+        """
+        Uczenie aż do maxEpisodes epizodów lub żądania zatrzymania.
+
+        Zwraca:
+            dict: wyniki uczenia (patrz results())
+        """
+        self.stop_requested = False
+        self.stop_reason = None
+        start_time = time.time() - self.elapsed
+
+        while self.episode < self.maxEpisodes:
+            self.run_episode()
+            self.update_statistics()
+            self.episodes_done = self.episode + 1
+            self.elapsed = time.time() - start_time
+
+            self.stop_reason = self.check_stopping()
+            if self.episodes_done >= self.maxEpisodes:
+                self.stop_reason = self.stop_reason or 'maxEpisodes'
+
+            self.notify_observers()
+
+            self.episode += 1
+            if self.stop_requested:
+                self.stop_reason = self.stop_reason or 'user'
+                break
+            if self.stop_reason is not None:
+                break
+
+        return self.results()
+
+    def notify_observers(self):
+        """Wywołuje obserwatorów (z pomiarem czasu przy profilowaniu)."""
+        for observer in self.observers:
+            if self.profiler is None:
+                observer(self)
+            else:
+                t0 = time.perf_counter()
+                observer(self)
+                self.profiler.lap(
+                    getattr(observer, 'profile_phase', 'observers'), t0)
+
+    def results(self):
+        """
+        Zwraca:
+            dict: Q, U, V, siatka i historia metryk
+        """
+        return {
+            'Q': self.Q,
+            'U': self.U,
+            'V': self.V,
+            'x1': self.x1,
+            'x2': self.x2,
+            'control': self.control,
+            'Vmean': np.array(self.Vmean),
+            'dVmean': np.array(self.dVmean),
+            'Qmean': np.array(self.Qmean),
+            'dQmean': np.array(self.dQmean),
+            'episodes': self.episodes_done,
+            'steps': self.steps,
+            'updates': self.updates,
+            'stop_reason': self.stop_reason,
+            'method': self.method,
+            'profile': (self.profiler.report()
+                        if self.profiler is not None else None),
+            'elapsed': self.elapsed,
+        }
+
+
+def make_trainer(config, observers=None):
+    """
+    Tworzy trenera na podstawie konfiguracji (słownik z kluczami jak
+    DEFAULT_CONFIG; brakujące klucze przyjmują wartości domyślne).
+
+    Pełna konfiguracja zapisywana jest w trainer.config.
+    """
+    unknown = set(config) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown configuration keys: {sorted(unknown)}.")
+    cfg = dict(DEFAULT_CONFIG)
+    cfg.update(config)
+
+    if cfg['dynamics'] not in tasks_names:
+        raise ValueError(
+            f"DynamicsName must be one of the predefined tasks: {tasks_names}.")
+    if cfg['control'] not in controls_names:
+        raise ValueError(
+            f"Control must be one of the predefined controls: "
+            f"{controls_names}.")
+
+    # Dyskretyzacja przestrzeni stanu X
+    # X1 - kąt
+    # X2 - prędkość kątowa
+    x1, x2 = GridSpec.from_config(cfg).axes()
+
+    x_InitCond = [np.pi, 1.0 if cfg['dynamics'] == 'Huśtawka' else 0.0]
+
+    trainer = QLearnTrainer(
+        tasks[cfg['dynamics']],
+        controls[cfg['control']] * float(cfg['u_max']),
+        x1, x2,
+        alpha=float(cfg['alpha']),
+        gamma=float(cfg['gamma']),
+        epsil=float(cfg['epsil']),
+        epsilDecay=float(cfg['epsilDecay']),
+        Qx1=float(cfg['Qx1']),
+        Qx2=float(cfg['Qx2']),
+        Ru1=float(cfg['Ru1']),
+        dt=float(cfg['dt']),
+        maxit=int(cfg['maxit']),
+        maxEpisodes=int(cfg['maxEpisodes']),
+        x_InitCond=x_InitCond,
+        observers=observers,
+        n_envs=int(cfg['n_envs']),
+        profile=bool(cfg['profile']),
+        rel_tol=cfg['rel_tol'],
+        window=int(cfg['window']),
+        policy_patience=cfg['policy_patience'],
+        max_seconds=cfg['max_seconds'],
+        max_steps=cfg['max_steps'],
+        q_dtype=cfg['q_dtype'],
+        integrator=cfg['integrator'],
+        substeps=int(cfg['substeps']),
+        planning_steps=int(cfg['planning_steps']),
+        planning_every=cfg['planning_every'],
+        memory_size=int(cfg['memory_size']),
+        method=cfg['method'],
+        lam=float(cfg['lam']),
+        trace_tol=float(cfg['trace_tol']),
+    )
+    trainer.config = cfg
+    return trainer
@@ -0,0 +1,384 @@
+"""
+Symulacja strategii bez interfejsu graficznego z zapisem trajektorii oraz
+odtwarzanie zapisu.
+
+TrajectoryRecorder zapisuje kolejne kroki (t, θ, dθ/dt, u, indeks komórki,
+użyty regulator) w buforach numpy i po zapełnieniu bufora zapisuje go jako
+kolejną porcję <katalog>/chunk_00000.npz, chunk_00001.npz, ... (atomowo,
+z nagłówkiem JSON jak w punktach kontrolnych). Pamięć nie rośnie z
+długością symulacji, a przerwany zapis zachowuje wszystkie pełne porcje.
+Odtwarzanie (replay) animuje zapis bez ponownego całkowania równań ruchu,
+a export_animation zapisuje animację do GIF/MP4 przez writery matplotlib.
+
+Uruchomienie:
+    python trajectory.py record Learn_X.npz [--fi0 180] [--om0 0]
+                         [--dt 0.01] [--steps N] [--lqr] [-o katalog]
+    python trajectory.py replay katalog [--every N] [--fps F]
+                         [--save plik.gif]
+"""
+import argparse
+import glob
+import os
+
+import numpy as np
+
+from checkpoint import load_checkpoint, load_policy, write_checkpoint
+from policy import Policy
+from toolbox import get_integrator, normalize_fi
+
+# kody regulatora w zapisie trajektorii
+CONTROLLERS = ('Q', 'LQR')
+
+
+class SimulationCore:
+    """
+    Symulacja ze stałym krokiem dt, niezależna od rysowania: advance(n)
+    wykonuje n kroków całkowania naraz, a ścieżka na mapie i zapis
+    trajektorii uzupełniane są po każdym kroku.
+
+    Parametry:
+        dynamics : callable
+            Model dynamiki
+        step : callable
+            Krok integratora (toolbox.get_integrator)
+        policy : Policy
+            Strategia Q (siatka stanu i sterowanie)
+        dt : float
+            Krok symulacji [s]
+        x0 : array-like
+            Stan początkowy
+        lqr : LQRController lub None
+            Regulator LQR (opcjonalnie)
+        path : PathBuffer lub None
+            Bufor ścieżki na mapie
+        recorder : TrajectoryRecorder lub None
+            Zapis trajektorii
+    """
+
+    def __init__(self, dynamics, step, policy, dt, x0, lqr=None,
+                 path=None, recorder=None):
+        self.dynamics = dynamics
+        self.step = step
+        self.policy = policy
+        self.grid = policy.grid
+        self.dt = dt
+        self.lqr = lqr
+        self.path = path
+        self.recorder = recorder
+        self.x = np.array(x0, dtype=float)
+        self.t = 0.0
+        self.steps = 0
+        self.k_x = self.grid.index(self.x)
+        self.controller = 0
+        self.u = self.control(self.x, self.k_x)
+
+    def control(self, x, k_x):
+        """Sterowanie w stanie x; ustawia self.controller (kod CONTROLLERS)."""
+        u = self.policy.control(x)
+        self.controller = 0
+        # LQR (opcjonalnie); poza obszarem przełączenia lub gdy równanie
+        # Riccatiego nie ma rozwiązania - sterowanie z Q-funkcji
+        if self.lqr is not None:
+            u_lqr = self.lqr.control(x, k_x)
+            if u_lqr is not None:
+                u = u_lqr
+                self.controller = 1
+        return u
+
+    def advance(self, n):
+        """Wykonanie n kroków symulacji."""
+        grid, path, recorder = self.grid, self.path, self.recorder
+        for _ in range(n):
+            u = self.control(self.x, self.k_x)
+            if recorder is not None:
+                recorder.record(self.t, self.x, u, self.k_x, self.controller)
+            x = self.step(self.dynamics, self.dt, self.x, u)
+            x[0] = normalize_fi(x[0])
+            self.x, self.u = x, u
+            self.k_x = grid.index(x)
+            self.t += self.dt
+            self.steps += 1
+            if path is not None:
+                path.append(*grid.point(self.k_x))
+
+
+class TrajectoryRecorder:
+    """
+    Strumieniowy zapis trajektorii w porcjach po chunk_size kroków.
+
+    Każdy krok to stan przed krokiem całkowania i zastosowane w nim
+    sterowanie. Należy wywołać close() (lub użyć `with`), aby zapisać
+    ostatnią, niepełną porcję.
+
+    Parametry:
+        directory : str
+            Katalog zapisu (tworzony w razie potrzeby); porcje wcześniejszego
+            zapisu w tym katalogu są usuwane, aby nie zostały doklejone do
+            nowej trajektorii przez load_trajectory
+        chunk_size : int
+            Liczba kroków w jednej porcji
+        meta : dict lub None
+            Dodatkowy nagłówek zapisywany w każdej porcji (np. zadanie, dt)
+    """
+
+    def __init__(self, directory, chunk_size=10000, meta=None):
+        if not (chunk_size >= 1):
+            raise ValueError("chunk_size must be a positive integer.")
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, 'chunk_*.npz')):
+            os.remove(path)
+        self.directory = directory
+        self.chunk_size = int(chunk_size)
+        self.meta = dict(meta or {})
+        self.t = np.zeros(self.chunk_size)
+        self.theta = np.zeros(self.chunk_size)
+        self.omega = np.zeros(self.chunk_size)
+        self.u = np.zeros(self.chunk_size)
+        self.cell = np.zeros(self.chunk_size, dtype=np.intp)
+        self.controller = np.zeros(self.chunk_size, dtype=np.int8)
+        self.n = 0  # kroki w bieżącym buforze
+        self.chunks = 0  # zapisane porcje
+        self.steps = 0  # wszystkie zapisane kroki
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, t, x, u, k_x, controller=0):
+        """Zapis jednego kroku."""
+        n = self.n
+        self.t[n] = t
+        self.theta[n] = x[0]
+        self.omega[n] = x[1]
+        self.u[n] = u
+        self.cell[n] = k_x
+        self.controller[n] = controller
+        self.n = n + 1
+        if self.n == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Zapis bieżącego bufora jako kolejnej porcji."""
+        if self.n == 0:
+            return
+        n = self.n
+        arrays = {
+            't': self.t[:n], 'theta': self.theta[:n],
+            'omega': self.omega[:n], 'u': self.u[:n],
+            'cell': self.cell[:n], 'controller': self.controller[:n],
+        }
+        meta = dict(self.meta, chunk=self.chunks,
+                    controllers=list(CONTROLLERS))
+        path = os.path.join(self.directory, f"chunk_{self.chunks:05d}.npz")
+        write_checkpoint(path, arrays, meta)
+        self.chunks += 1
+        self.steps += n
+        self.n = 0
+
+    def close(self):
+        self.flush()
+
+
+def load_trajectory(directory):
+    """
+    Wczytanie wszystkich porcji zapisu.
+
+    Zwraca:
+        dict: tablice 't', 'theta', 'omega', 'u', 'cell', 'controller'
+        oraz 'meta' (nagłówek pierwszej porcji)
+    """
+    paths = sorted(glob.glob(os.path.join(directory, 'chunk_*.npz')))
+    if not paths:
+        raise FileNotFoundError(f"No trajectory chunks in {directory}.")
+    chunks = [load_checkpoint(path) for path in paths]
+    data = {key: np.concatenate([arrays[key] for arrays, _ in chunks])
+            for key in chunks[0][0]}
+    data['meta'] = chunks[0][1]
+    return data
+
+
+def record_rollout(policy, x0, directory, dt=None, steps=None, lqr=None,
+                   chunk_size=10000, interpolate=False):
+    """
+    Symulacja strategii bez wykresów z zapisem trajektorii.
+
+    Parametry:
+        policy : dict
+            Strategia jak z checkpoint.load_policy
+        x0 : array-like
+            Stan początkowy
+        directory : str
+            Katalog zapisu
+        dt : float lub None
+            Krok symulacji (None - krok z uczenia)
+        steps : int lub None
+            Liczba kroków (None - maxit z uczenia)
+        lqr : LQRController lub None
+            Regulator LQR (opcjonalnie)
+        interpolate : bool
+            Sterowanie z dwuliniowej interpolacji Q (Policy)
+
+    Zwraca:
+        SimulationCore: stan symulacji po ostatnim kroku
+    """
+    dt = policy['dt'] if dt is None else dt
+    steps = policy['maxit'] if steps is None else steps
+    step, _ = get_integrator(policy.get('integrator', 'rk4'),
+                             policy.get('substeps', 1))
+    meta = {
+        'label': policy['StudInd'],
+        'dynamics': policy['DynName'],
+        'dt': dt,
+        'integrator': policy.get('integrator', 'rk4'),
+        'substeps': policy.get('substeps', 1),
+        'x0': [float(v) for v in x0],
+        'interpolate': interpolate,
+    }
+    with TrajectoryRecorder(directory, chunk_size, meta) as recorder:
+        sim = SimulationCore(policy['DynamicsAct'], step,
+                             Policy.from_policy(policy, interpolate), dt, x0,
+                             lqr=lqr, recorder=recorder)
+        sim.advance(steps)
+    return sim
+
+
+def _animation(fig, data, every=1, fps=30):
+    """
+    Animacja zapisu na figurze fig: wahadło i trajektoria na płaszczyźnie
+    stanu (co every-ty krok zapisu na klatkę).
+    """
+    from matplotlib.animation import FuncAnimation
+
+    theta, omega, u, t = data['theta'], data['omega'], data['u'], data['t']
+    swing = 1 if data['meta'].get('dynamics') == 'Huśtawka' else 0
+    frames = np.arange(0, len(t), every)
+    PendLen0 = 2.0
+
+    ax_pend, ax_state = fig.subplots(1, 2)
+    ax_pend.set_aspect('equal')
+    ax_pend.set_xlim(-3, 3)
+    ax_pend.set_ylim(-3, 3)
+    ax_pend.axis('off')
+    ax_pend.plot(0.0, 0.15, 'vr', markersize=10, linewidth=1)
+    f, = ax_pend.plot([0, 0], [0, 0], 'k', linewidth=1)
+    f1, = ax_pend.plot([0, 0], [0, 0], 'b', linewidth=5)
+    f2, = ax_pend.plot([0, 0], [0, 0], 'go', markerfacecolor='black',
+                       linewidth=5)
+    txt = ax_pend.text(-3, -4.5, '', fontsize=9, family='monospace')
+
+    ax_state.plot(theta, omega, ',', color='0.7')
+    ax_state.set_xlim(-np.pi, np.pi)
+    ax_state.set_xlabel('θ (rad)')
+    ax_state.set_ylabel('dθ/dt (rad/s)')
+    ax_state.set_title(f"{data['meta'].get('label', '')} "
+                       f"({data['meta'].get('dynamics', '')})")
+    tail, = ax_state.plot([], [], 'b-', linewidth=1)
+    point, = ax_state.plot([], [], 'ro')
+    controllers = data['meta'].get('controllers', list(CONTROLLERS))
+
+    def draw(k):
+        PendLen = PendLen0 + 0.5 * u[k] * swing
+        se, ce = np.sin(theta[k]), np.cos(theta[k])
+        f.set_data([0, -PendLen * se], [0, PendLen * ce])
+        f1.set_color('b' if u[k] > 0 else 'r' if u[k] < 0 else 'w')
+        f1.set_data([-PendLen * se, -PendLen * se + u[k] * ce * (1 - swing)],
+                    [PendLen * ce, PendLen * ce + u[k] * se * (1 - swing)])
+        f2.set_data([-PendLen * se], [PendLen * ce])
+        start = max(0, k - 50 * every)
+        tail.set_data(theta[start:k + 1], omega[start:k + 1])
+        point.set_data([theta[k]], [omega[k]])
+        txt.set_text(f'θ = {theta[k]*180.0/np.pi:8.4f} [deg]\n'
+                     f'dθ/dt = {omega[k]:8.4f} [rad/s]\n'
+                     f'u = {u[k]:8.4f} [N] '
+                     f'({controllers[data["controller"][k]]})\n'
+                     f't = {t[k]:8.4f} [s]')
+        return f, f1, f2, tail, point, txt
+
+    return FuncAnimation(fig, draw, frames=frames, interval=1000.0 / fps,
+                         blit=True)
+
+
+def replay(data, every=1, fps=30):
+    """Odtworzenie zapisu w oknie matplotlib."""
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(10, 5))
+    anim = _animation(fig, data, every, fps)  # noqa: F841 (referencja)
+    plt.show()
+
+
+def export_animation(data, path, every=1, fps=30, dpi=100):
+    """
+    Zapis animacji do pliku: .gif przez PillowWriter, inne rozszerzenia
+    (np. .mp4) przez FFMpegWriter.
+    """
+    # Figure bez pyplot - działa bez ekranu i bez okien
+    from matplotlib.animation import FFMpegWriter, PillowWriter
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 5))
+    anim = _animation(fig, data, every, fps)
+    writer = (PillowWriter(fps=fps) if path.lower().endswith('.gif')
+              else FFMpegWriter(fps=fps))
+    anim.save(path, writer=writer, dpi=dpi)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Zapis i odtwarzanie trajektorii strategii")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help="symulacja z zapisem trajektorii")
+    rec.add_argument('policy', help="plik strategii (.npz lub .pkl)")
+    rec.add_argument('--fi0', type=float, default=180.0,
+                     help="kąt początkowy [deg]")
+    rec.add_argument('--om0', type=float, default=0.0,
+                     help="prędkość początkowa [rad/s]")
+    rec.add_argument('--dt', type=float, default=None,
+                     help="krok symulacji (domyślnie krok z uczenia)")
+    rec.add_argument('--steps', type=int, default=None,
+                     help="liczba kroków (domyślnie maxit z uczenia)")
+    rec.add_argument('--lqr', action='store_true',
+                     help="sterowanie LQR (tablica <strategia>_lqr.npz, "
+                          "jeżeli istnieje)")
+    rec.add_argument('--interpolate', action='store_true',
+                     help="dwuliniowa interpolacja Q")
+    rec.add_argument('--chunk', type=int, default=10000,
+                     help="liczba kroków w porcji zapisu")
+    rec.add_argument('-o', '--output', default=None,
+                     help="katalog zapisu (domyślnie Traj_<etykieta>)")
+
+    rep = sub.add_parser('replay', help="odtworzenie lub eksport zapisu")
+    rep.add_argument('directory', help="katalog zapisu")
+    rep.add_argument('--every', type=int, default=1,
+                     help="co który krok zapisu na klatkę")
+    rep.add_argument('--fps', type=float, default=30,
+                     help="klatki na sekundę")
+    rep.add_argument('--save', default=None,
+                     help="plik animacji (.gif lub .mp4) zamiast okna")
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        policy = load_policy(args.policy)
+        lqr = None
+        if args.lqr:
+            from lqr import controller_for_policy, gain_table_path
+
+            lqr = controller_for_policy(policy)
+            table_path = gain_table_path(args.policy)
+            if os.path.exists(table_path):
+                lqr.load_table(table_path)
+        directory = args.output or f"Traj_{policy['StudInd']}"
+        sim = record_rollout(policy, [args.fi0 * np.pi / 180.0, args.om0],
+                             directory, args.dt, args.steps, lqr,
+                             args.chunk, args.interpolate)
+        print(f"Zapisano {sim.steps} kroków ({sim.t:.2f} s) w {directory}")
+    else:
+        data = load_trajectory(args.directory)
+        if args.save:
+            export_animation(data, args.save, args.every, args.fps)
+            print(f"Zapisano {args.save}")
+        else:
+            replay(data, args.every, args.fps)